@@ -1,4 +1,14 @@
 from .aiographite import AIOGraphite, connect  # noqa
+from .pool import AIOGraphitePool, connect_pool  # noqa
+from .router import AIOGraphiteRouter  # noqa
+from .aggregator import Aggregator  # noqa
+from .threaded import ThreadedAIOGraphite  # noqa
+from .collector import Collector, CollectorClient  # noqa
+from .sync import GraphiteClient, connect_sync  # noqa
+from .transport import (  # noqa
+    Transport, TCPTransport, UnixTransport, MemoryTransport, UDPTransport
+)
+from .graphite_encoder import GraphiteEncoder  # noqa
 
 
 __version__ = '0.1.9'
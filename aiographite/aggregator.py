@@ -0,0 +1,190 @@
+import asyncio
+import contextlib
+import logging
+import math
+import time
+from aiographite.aiographite import AIOGraphite, AioGraphiteSendException
+from typing import Tuple, List, Hashable
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PERCENTILES = (50, 90, 99)
+
+# metric name prefixes per metric type, as in StatsD, so that e.g. a
+# counter and a timer of the same name do not both send <metric>.count
+COUNTER_PREFIX = 'counters.'
+GAUGE_PREFIX = 'gauges.'
+TIMER_PREFIX = 'timers.'
+SET_PREFIX = 'sets.'
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """
+    Nearest-rank percentile of an already sorted, non empty list.
+    """
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class Aggregator:
+    """
+    Aggregator accumulates high-frequency events in memory, StatsD style,
+    and flushes one point per metric and per statistic every interval
+    seconds through AIOGraphite.send_multiple.
+
+    args: client, an AIOGraphite (or AIOGraphitePool); interval, seconds
+    between flushes; percentiles, the timer percentiles to report;
+    counter_prefix, gauge_prefix, timer_prefix and set_prefix, prepended
+    to the metric names of each type.
+
+    Every flush sends:
+
+    * counters: counters.<metric>.count, the sum of increments over the
+      interval, and counters.<metric>.rate, that sum per second.
+    * gauges: gauges.<metric>, the last value set. Gauges keep being
+      reported until they are set again.
+    * timers: timers.<metric>.count, .lower, .upper, .mean and .p<N> for
+      every configured percentile, dots in N being replaced by
+      underscores (p99_9).
+    * sets: sets.<metric>.count, the number of distinct members.
+    """
+
+    def __init__(self, client: AIOGraphite, interval: float=10,
+                 percentiles: Tuple[float, ...]=DEFAULT_PERCENTILES,
+                 counter_prefix: str=COUNTER_PREFIX,
+                 gauge_prefix: str=GAUGE_PREFIX,
+                 timer_prefix: str=TIMER_PREFIX,
+                 set_prefix: str=SET_PREFIX):
+        self._client = client
+        self.interval = interval
+        self.percentiles = percentiles
+        self.counter_prefix = counter_prefix
+        self.gauge_prefix = gauge_prefix
+        self.timer_prefix = timer_prefix
+        self.set_prefix = set_prefix
+        self._counters = {}
+        self._gauges = {}
+        self._timers = {}
+        self._sets = {}
+        self._flush_task = None
+        self._last_flush = time.time()
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, tb):
+        await self.stop()
+
+    def incr(self, metric: str, value: float=1) -> None:
+        """
+        Increment a counter.
+        """
+        self._counters[metric] = self._counters.get(metric, 0) + value
+
+    def gauge(self, metric: str, value: float, delta: bool=False) -> None:
+        """
+        Set a gauge, or adjust it by value if delta is True.
+        """
+        if delta:
+            value += self._gauges.get(metric, 0)
+        self._gauges[metric] = value
+
+    def timing(self, metric: str, value: float) -> None:
+        """
+        Record a duration, in milliseconds.
+        """
+        self._timers.setdefault(metric, []).append(value)
+
+    @contextlib.contextmanager
+    def timer(self, metric: str):
+        """
+        Record the duration of the wrapped block, in milliseconds.
+
+        example:
+
+        .. code:: python
+
+            with aggregator.timer('db.query'):
+                await run_query()
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timing(metric, (time.perf_counter() - start) * 1000)
+
+    def set_add(self, metric: str, member: Hashable) -> None:
+        """
+        Add a member to a set, counting distinct members.
+        """
+        self._sets.setdefault(metric, set()).add(member)
+
+    def start(self) -> None:
+        """
+        Start flushing every interval seconds in the background.
+        """
+        if self._flush_task is None:
+            self._last_flush = time.time()
+            self._flush_task = asyncio.ensure_future(
+                self._flush_periodically())
+
+    async def stop(self) -> None:
+        """
+        Stop the background flush, and flush what has been accumulated.
+        """
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        """
+        Send the aggregated points, and reset counters, timers and sets.
+        """
+        now = time.time()
+        elapsed = max(now - self._last_flush, 1e-9)
+        self._last_flush = now
+        counters, self._counters = self._counters, {}
+        timers, self._timers = self._timers, {}
+        sets, self._sets = self._sets, {}
+        dataset = []
+        for metric, count in counters.items():
+            metric = self.counter_prefix + metric
+            dataset.append((metric + ".count", count))
+            dataset.append((metric + ".rate", count / elapsed))
+        for metric, value in self._gauges.items():
+            dataset.append((self.gauge_prefix + metric, value))
+        for metric, values in timers.items():
+            dataset.extend(
+                self._timer_stats(self.timer_prefix + metric, values))
+        for metric, members in sets.items():
+            dataset.append((self.set_prefix + metric + ".count", len(members)))
+        await self._client.send_multiple(dataset, int(now))
+
+    def _timer_stats(self, metric: str, values: List[float]) -> List[Tuple]:
+        values.sort()
+        stats = [
+            (metric + ".count", len(values)),
+            (metric + ".lower", values[0]),
+            (metric + ".upper", values[-1]),
+            (metric + ".mean", sum(values) / len(values)),
+        ]
+        for pct in self.percentiles:
+            # a dot would add a level to the metric path
+            name = metric + ".p" + ("%g" % pct).replace('.', '_')
+            stats.append((name, percentile(values, pct)))
+        return stats
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except AioGraphiteSendException as e:
+                logger.warning("Dropped aggregated metrics: %s", e)
@@ -1,29 +1,65 @@
 from .graphite_encoder import GraphiteEncoder
 import asyncio
+import itertools
+import logging
 import time
-from aiographite.protocol import PlaintextProtocol, PickleProtocol
-from typing import Tuple, List, Callable
+from aiographite.buffer import MetricBuffer, OVERFLOW_BLOCK
+from aiographite.circuit import CLOSED, OPEN, HALF_OPEN
+from aiographite.exceptions import AioGraphiteSendException
+from aiographite.protocol import (
+    PlaintextProtocol, PickleProtocol, _as_list, _check_column_lengths
+)
+from aiographite.stats import ClientStats
+from aiographite.transport import TCPTransport
+from typing import Tuple, List, Iterable, Callable, Union
 
 DEFAULT_GRAPHITE_PICKLE_PORT = 2004
 DEFAULT_GRAPHITE_PLAINTEXT_PORT = 2003
 
+# flush_interval of a client whose only buffering setting is
+# max_queue_points, so that queued points do not wait for close().
+DEFAULT_FLUSH_INTERVAL = 1.0
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize_data_list(dataset: List[Tuple],
+                         timestamp: int) -> List[Tuple[str, int, int]]:
+    """
+        turn a dataset of (metric, value) or (metric, value, timestamp)
+        tuples into a list of (metric, value, timestamp) tuples.
+    """
+    listofData = []
+    for data in dataset:
+        # unpack metric data
+        if len(data) == 2:
+            (metric, value) = data
+        else:
+            (metric, value, data_timestamp) = data
+            timestamp = data_timestamp
+        listofData.append((metric, value, timestamp))
+    return listofData
+
 
 async def connect(host, port=DEFAULT_GRAPHITE_PLAINTEXT_PORT,
-                  protocol=PlaintextProtocol(), loop=None):
+                  protocol=PlaintextProtocol(), loop=None, **kwargs):
     """
     A factory for connecting to Graphite Server.
 
-    args: host, port, protocol, loop.
+    args: host, port, protocol, loop. Any extra keyword arguments
+    (timeout, max_batch_points, ...) are passed on to AIOGraphite.
 
     Returns an instantiated AIOGraphite .
     """
-    conn = AIOGraphite(host, port, protocol, loop)
+    conn = AIOGraphite(host, port, protocol, **kwargs)
     await conn._connect()
     return conn
 
 
-class AioGraphiteSendException(Exception):
-    pass
+def _message_size(message: Union[bytes, List]) -> int:
+    if isinstance(message, list):
+        return sum(len(buffer) for buffer in message)
+    return len(message)
 
 
 class AIOGraphite:
@@ -32,19 +68,117 @@ class AIOGraphite:
     designed to help Graphite users to send data into graphite easily.
 
     Loop parameter is removed from this version as in python 3.10 and above parameter is removed
+
+    Buffered mode is enabled by setting any of max_batch_points,
+    max_batch_bytes or flush_interval (seconds). In buffered mode send and
+    send_multiple only enqueue points in memory; a background task flushes
+    them once a threshold is reached or flush_interval has elapsed.
+
+    max_queue_points bounds the number of points held in memory while
+    graphite is slow or unreachable; overflow_policy ('block',
+    'drop_newest', 'drop_oldest' or 'sample') decides what happens to
+    points sent once the queue is full. See MetricBuffer for details.
+    Setting max_queue_points alone also enables buffered mode, with a
+    flush_interval of DEFAULT_FLUSH_INTERVAL seconds.
+
+    transport replaces the TCP connection to graphite_server:graphite_port
+    (TCPTransport) with another transport: UDPTransport, UnixTransport,
+    MemoryTransport or any aiographite.transport.Transport. It can be a
+    transport instance, or a transport class instantiated with
+    graphite_server, graphite_port and the timeouts that are set.
+
+    timeout bounds the time spent waiting for a write to be drained,
+    connect_timeout the time spent connecting, and idle_timeout the time
+    a connection may stay unused before being reopened ahead of the next
+    write. See StreamTransport.
+
+    spool, a DiskSpool, keeps messages that could not be sent on disk
+    instead of raising AioGraphiteSendException. They are replayed in the
+    background, oldest first, as soon as a send succeeds again.
+
+    circuit_breaker, an aiographite.circuit.CircuitBreaker, stops sending
+    after repeated failures: while the circuit is open, messages go to
+    the spool if there is one, and are otherwise dropped and counted in
+    dropped_messages, without touching the network. A background task
+    reconnects after the breaker's backoff delay, closes the circuit
+    once it succeeds, and starts replaying the spool. Messages the spool
+    fails to store (disk full...) are dropped and counted as well.
+
+    stats() returns counters and histograms of the client's own activity.
+    With stats_prefix set, they are also sent every stats_interval
+    seconds as graphite metrics under that prefix, on this connection.
+
+    hooks, an aiographite.hooks.ClientHooks, is called around encoding,
+    writing and retrying each message, and whenever points are dropped.
     """
 
     def __init__(self, graphite_server,
                  graphite_port=DEFAULT_GRAPHITE_PLAINTEXT_PORT,
-                 protocol=PlaintextProtocol(), timeout=None):
+                 protocol=PlaintextProtocol(), timeout=None,
+                 max_batch_points=None, max_batch_bytes=None,
+                 flush_interval=None, max_queue_points=None,
+                 overflow_policy=OVERFLOW_BLOCK, transport=None,
+                 spool=None, circuit_breaker=None, connect_timeout=None,
+                 idle_timeout=None, stats_prefix=None, stats_interval=60,
+                 hooks=None):
         if not isinstance(protocol, (PlaintextProtocol, PickleProtocol)):
             raise AioGraphiteSendException("Unsupported Protocol!")
+        # only stream transports accept timeouts: the others raise a
+        # TypeError rather than silently ignoring them
+        options = {
+            name: value for name, value in (
+                ('timeout', timeout), ('connect_timeout', connect_timeout),
+                ('idle_timeout', idle_timeout))
+            if value is not None
+        }
+        if transport is None:
+            transport = TCPTransport(graphite_server, graphite_port,
+                                     **options)
+        elif isinstance(transport, type):
+            transport = transport(graphite_server, graphite_port, **options)
+        if getattr(transport, 'plaintext_only', False) and \
+                not isinstance(protocol, PlaintextProtocol):
+            raise AioGraphiteSendException(
+                f"{type(transport).__name__} only supports "
+                f"the plaintext protocol!")
+        self.transport = transport
+        self.spool = spool
+        self._replay_task = None
+        self.circuit_breaker = circuit_breaker
+        self.dropped_messages = 0
+        self._probe_task = None
         self._graphite_server = graphite_server
         self._graphite_port = graphite_port
         self._graphite_server_address = (graphite_server, graphite_port)
-        self._reader, self._writer = None, None
         self._timeout = timeout
         self.protocol = protocol
+        self._buffer = None
+        if any((max_batch_points, max_batch_bytes, flush_interval,
+                max_queue_points)):
+            self._buffer = MetricBuffer(max_batch_points, max_batch_bytes,
+                                        max_queue_points, overflow_policy)
+            if not any((max_batch_points, max_batch_bytes, flush_interval)):
+                flush_interval = DEFAULT_FLUSH_INTERVAL
+        self._flush_interval = flush_interval
+        self._flush_task = None
+        self._flush_wakeup = None
+        self._buffer_space = None
+        self._closing = False
+        self._stats = ClientStats()
+        self._stats_prefix = stats_prefix
+        self._stats_interval = stats_interval
+        self._stats_task = None
+        self.hooks = hooks
+        if hooks is not None:
+            self.transport.hooks = hooks
+
+    @property
+    def _reader(self):
+        return getattr(self.transport, '_reader', None)
+
+    @property
+    def _writer(self):
+        return getattr(self.transport, '_writer', None)
 
     async def __aenter__(self):
         await self._connect()
@@ -62,11 +196,15 @@ class AIOGraphite:
         if not metric:
             return
         timestamp = int(timestamp or time.time())
-        # Generate message based on protocol
         listOfMetricTuples = [(metric, value, timestamp)]
-        message = self.protocol.generate_message(listOfMetricTuples)
+        if self._buffer is not None:
+            await self._enqueue(listOfMetricTuples)
+            return
+        # Generate message based on protocol
+        message = self._encode(1, self.protocol.generate_message,
+                               listOfMetricTuples)
         # Sending Data
-        await self._send_message(message)
+        await self._send_message(message, 1)
 
     async def send_multiple(self, dataset: List[Tuple],
                             timestamp: int=None) -> None:
@@ -79,42 +217,150 @@ class AIOGraphite:
         if not dataset:
             return
         timestamp = int(timestamp or time.time())
+        if self._buffer is not None:
+            await self._enqueue(
+                self._normalize_data_list(dataset, timestamp))
+            return
         # Generate message based on protocol
-        message = self._generate_message_for_data_list(
+        message = self._encode(
+            len(dataset), self._generate_message_for_data_list,
             dataset,
             timestamp,
-            self.protocol.generate_message)
+            self.protocol.generate_buffers)
+        # Sending Data
+        await self._send_message(message, len(dataset))
+
+    async def send_columns(self, metrics, values, timestamps=None) -> None:
+        """
+        send parallel columns of metrics and values.
+
+        args: metrics, values, timestamps. Columns can be lists, tuples,
+        array.array or NumPy arrays. timestamps is optional, and can be
+        either a column or a single timestamp shared by every point.
+        """
+        if len(metrics) == 0:
+            return
+        if timestamps is None or not hasattr(timestamps, '__len__'):
+            timestamps = int(timestamps or time.time())
+        if self._buffer is not None:
+            _check_column_lengths(metrics, values, timestamps)
+            if hasattr(timestamps, '__len__'):
+                timestamps = _as_list(timestamps)
+            else:
+                timestamps = itertools.repeat(timestamps)
+            await self._enqueue(
+                zip(_as_list(metrics), _as_list(values), timestamps))
+            return
+        # Generate message based on protocol
+        message = self._encode(
+            len(metrics), self.protocol.generate_message_from_columns,
+            metrics, values, timestamps)
         # Sending Data
-        await self._send_message(message)
+        await self._send_message(message, len(metrics))
+
+    async def send_stream(self, stream, chunk_size: int=1000,
+                          timestamp: int=None) -> None:
+        """
+        send tuples pulled lazily from a sync or async iterable.
+
+        args: an iterable or async iterable of tuples (metric, value,
+        timestamp), chunk_size, and timestamp is optional.
+
+        Points are encoded and sent chunk_size at a time (one pickle frame
+        per chunk), and each chunk waits for the previous one to be
+        drained, so memory use does not grow with the size of the stream.
+        """
+        timestamp = int(timestamp or time.time())
+        if hasattr(stream, '__aiter__'):
+            chunk = []
+            async for data in stream:
+                chunk.append(data)
+                if len(chunk) >= chunk_size:
+                    await self.send_multiple(chunk, timestamp)
+                    chunk = []
+            await self.send_multiple(chunk, timestamp)
+            return
+        iterator = iter(stream)
+        while True:
+            chunk = list(itertools.islice(iterator, chunk_size))
+            if not chunk:
+                return
+            await self.send_multiple(chunk, timestamp)
+
+    async def flush(self) -> None:
+        """
+        Send every buffered point to graphite server right away.
+
+        Does nothing when buffered mode is disabled or the buffer is empty.
+        """
+        if not self._buffer:
+            return
+        points = self._buffer.drain()
+        message = self._encode(len(points), self.protocol.generate_buffers,
+                               points)
+        if self._buffer_space is not None:
+            self._buffer_space.set()
+        await self._send_message(message, len(points))
+
+    def stats(self) -> dict:
+        """
+        Counters and histograms of the client's activity since it was
+        created: see aiographite.stats.ClientStats, plus reconnects and
+        retries of the transport, dropped_points and dropped_messages.
+        """
+        return self._stats.snapshot(**self._extra_stats())
+
+    @property
+    def dropped_points(self) -> int:
+        """
+        Number of points discarded because the send queue was full.
+        """
+        if self._buffer is None:
+            return 0
+        return self._buffer.dropped_points
 
     async def close(self) -> None:
         """
-        Close the TCP connection to graphite server.
+        Flush any buffered points, then close the TCP connection to
+        graphite server.
         """
-        await self._disconnect()
+        if self._flush_task is not None:
+            # let a flush in progress complete, so that the points it has
+            # taken from the buffer are not lost
+            self._closing = True
+            self._flush_wakeup.set()
+            try:
+                await self._flush_task
+            finally:
+                self._flush_task = None
+                self._closing = False
+        try:
+            await self.flush()
+        finally:
+            for task in (self._replay_task, self._probe_task,
+                         self._stats_task):
+                if task is None:
+                    continue
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+            if self.spool is not None:
+                self.spool.close()
+            await self._disconnect()
 
     async def _connect(self) -> None:
         """
         Connect to Graphite Server based on Provided Server Address
         """
-        try:
-            self._reader, self._writer = await asyncio.open_connection(
-                self._graphite_server,
-                self._graphite_port)
-        except Exception as e:
-            raise AioGraphiteSendException(f"Unable to connect to the provided server address "
-                                           f"{self._graphite_server_address} due to error : {e}")
+        await self.transport.connect()
 
     async def _disconnect(self) -> None:
         """
-        Close the TCP connection to graphite server.
+        Close the connection to graphite server.
         """
-        try:
-            if self._writer:
-                self._writer.close()
-        finally:
-            self._writer = None
-            self._reader = None
+        await self.transport.close()
 
     def clean_and_join_metric_parts(self, metric_parts: List[str]) -> str:
         """
@@ -132,48 +378,261 @@ class AIOGraphite:
 
             metric = aiographite.clean_and_join_metric_parts(metric_parts)
         """
-        return ".".join([
-                GraphiteEncoder.encode(dir_name) for dir_name in metric_parts
-            ])
+        return GraphiteEncoder.join_metric_parts(metric_parts)
+
+    def metric(self, metric_parts) -> "MetricHandle":
+        """
+        Register a metric, and return a handle sending points to it.
+
+        args: a list of metric parts(string), cleaned and joined with
+        clean_and_join_metric_parts, or an already valid metric name.
+
+        The name is cleaned once. With the plaintext protocol and no
+        buffering, it is also encoded once, so sending through the handle
+        does no string work on the name. In buffered mode, and with the
+        pickle protocol, the name is still encoded with the rest of the
+        batch.
+
+        example:
+
+        .. code:: python
+
+            requests = aiographite.metric(['web', host, 'requests'])
+            await requests.send(value)
+            await requests.inc()
+        """
+        if isinstance(metric_parts, str):
+            name = metric_parts
+        else:
+            name = self.clean_and_join_metric_parts(metric_parts)
+        return MetricHandle(self, name)
 
-    async def _send_message(self, message: bytes) -> None:
+    def _encode(self, points: int, generate: Callable, *args):
         """
-            @message: data ready to sent to graphite server
+            call generate(*args) to encode a message of points points,
+            timing it.
         """
-        if not self._writer:
-            await self._connect()
-        attempts = 3
-        while attempts > 0:
+        hooks = self.hooks
+        if hooks is not None:
+            hooks.pre_encode(points)
+        start = time.perf_counter()
+        message = generate(*args)
+        elapsed = time.perf_counter() - start
+        self._stats.encode_time.observe(elapsed)
+        self._stats.batch_points.observe(points)
+        if hooks is not None:
+            hooks.post_encode(points, _message_size(message), elapsed)
+        return message
+
+    async def _send_message(self, message: Union[bytes, List],
+                            points: int=0) -> None:
+        """
+            @message: data ready to sent to graphite server, either
+            bytes or a list of buffers.
+            @points: number of points in the message, for stats.
+        """
+        if self._stats_prefix is not None and self._stats_task is None:
+            self._stats_task = asyncio.ensure_future(
+                self._report_stats_periodically())
+        breaker = self.circuit_breaker
+        if breaker is not None and not breaker.allow_request():
+            self._short_circuit(message, points)
+            return
+        stats, hooks = self._stats, self.hooks
+        size = _message_size(message)
+        if hooks is not None:
+            hooks.pre_write(points, size)
+        start = time.perf_counter()
+        try:
+            await self.transport.send(message)
+        except AioGraphiteSendException:
+            stats.send_errors += 1
+            if breaker is not None:
+                self._record_failure()
+            if self.spool is None:
+                raise
+            self._short_circuit(message, points)
+            return
+        elapsed = time.perf_counter() - start
+        if hooks is not None:
+            hooks.post_drain(points, size, elapsed)
+        stats.send_time.observe(elapsed)
+        stats.messages_sent += 1
+        stats.points_sent += points
+        stats.bytes_sent += size
+        if breaker is not None:
+            breaker.record_success()
+        self._start_replay()
+
+    def _extra_stats(self) -> dict:
+        return {
+            'reconnects': getattr(self.transport, 'reconnects', 0),
+            'retries': getattr(self.transport, 'retries', 0),
+            'dropped_points': self.dropped_points,
+            'dropped_messages': self.dropped_messages,
+        }
+
+    async def _report_stats_periodically(self) -> None:
+        """
+            background task sending the client's stats under stats_prefix
+            every stats_interval seconds.
+        """
+        while True:
+            await asyncio.sleep(self._stats_interval)
+            dataset = self._stats.report(self._stats_prefix,
+                                         **self._extra_stats())
             try:
-                self._writer.write(message)
-                await asyncio.wait_for(
-                    self._writer.drain(),
-                    timeout=self._timeout
-                    )
-                return
-            except Exception:
-                # If failed to send data, then try to set up a
-                # new connection
+                await self.send_multiple(dataset)
+            except AioGraphiteSendException as e:
+                logger.warning("Dropped client stats: %s", e)
+
+    def _start_replay(self) -> None:
+        """
+            replay the spool in the background, unless it is empty or
+            already being replayed.
+        """
+        if self.spool and self._replay_task is None:
+            self._replay_task = asyncio.ensure_future(self._replay_spool())
+
+    def _record_failure(self) -> None:
+        """
+            report a failed send to the circuit breaker, and start
+            probing the server if that opened the circuit.
+        """
+        self.circuit_breaker.record_failure()
+        if self.circuit_breaker.state == OPEN and self._probe_task is None:
+            self._probe_task = asyncio.ensure_future(self._probe_circuit())
+
+    async def _probe_circuit(self) -> None:
+        """
+            background task reconnecting once the circuit breaker's delay
+            has elapsed, until a reconnection succeeds and closes the
+            circuit.
+        """
+        breaker = self.circuit_breaker
+        try:
+            while breaker.state != CLOSED:
+                await asyncio.sleep(breaker.retry_after)
+                if not breaker.begin_probe():
+                    continue
                 try:
-                    await self._disconnect()
-                    await self._connect()
-                except Exception:
-                    # if all attempts failed, then raise exception
-                    if attempts == 1:
-                        raise AioGraphiteSendException(
-                                "Failed to send metrics after"
-                                "reaching max retries!"
-                            )
-                    else:
-                        pass
-                attempts = attempts - 1
+                    await self.transport.close()
+                    await self.transport.connect()
+                except AioGraphiteSendException as e:
+                    logger.debug("Circuit breaker probe failed: %s", e)
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+            self._start_replay()
+        finally:
+            if breaker.state == HALF_OPEN:
+                # the probe was cancelled before reporting its outcome
+                breaker.record_failure()
+            self._probe_task = None
+
+    def _short_circuit(self, message: Union[bytes, List],
+                       points: int=0) -> None:
+        """
+            keep a message that cannot be sent in the spool, or drop it.
+        """
+        if self.spool is None:
+            self.dropped_messages += 1
+            if self.hooks is not None:
+                self.hooks.on_drop(points, 'circuit_open')
+            return
+        if isinstance(message, list):
+            message = b"".join(message)
+        try:
+            self.spool.append(message)
+        except OSError as e:
+            logger.warning("Dropped metrics, failed to spool them: %s", e)
+            self.dropped_messages += 1
+            if self.hooks is not None:
+                self.hooks.on_drop(points, 'spool_failed')
+
+    async def _replay_spool(self) -> None:
+        """
+            background task replaying spooled messages, until the spool is
+            empty or a send fails.
+        """
+        try:
+            await self.spool.replay(self.transport.send)
+        except (AioGraphiteSendException, OSError) as e:
+            logger.info("Stopped replaying spooled metrics: %s", e)
+        finally:
+            self._replay_task = None
+
+    async def _enqueue(self, points: Iterable[Tuple[str, int, int]]) -> None:
+        """
+            add points to the buffer, and wake up the flush task if
+            a threshold has been reached. With the 'block' overflow
+            policy, wait for the flush task to make room when the
+            queue is full.
+        """
+        self._start_flush_task()
+        if self._buffer.overflow_policy == OVERFLOW_BLOCK:
+            for point in points:
+                while not self._buffer.add(*point):
+                    # the client may have been closed in the meantime
+                    self._start_flush_task()
+                    self._buffer_space.clear()
+                    self._flush_wakeup.set()
+                    await self._buffer_space.wait()
+        elif self.hooks is None:
+            self._buffer.extend(points)
+        else:
+            dropped = self._buffer.dropped_points
+            self._buffer.extend(points)
+            dropped = self._buffer.dropped_points - dropped
+            if dropped:
+                self.hooks.on_drop(dropped, 'queue_full')
+        if self._buffer.is_full():
+            self._flush_wakeup.set()
+
+    def _start_flush_task(self) -> None:
+        """
+            start the background flush task if it is not running.
+        """
+        if self._flush_task is not None:
+            return
+        if self._flush_wakeup is None:
+            self._flush_wakeup = asyncio.Event()
+            self._buffer_space = asyncio.Event()
+        self._flush_task = asyncio.ensure_future(self._flush_periodically())
+
+    async def _flush_periodically(self) -> None:
+        """
+            background task flushing the buffer whenever it is full, or
+            every flush_interval seconds, until the client is closed.
+        """
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_wakeup.wait(),
+                                       timeout=self._flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_wakeup.clear()
+            if self._closing:
+                return
+            try:
+                await self.flush()
+            except AioGraphiteSendException as e:
+                logger.warning("Dropped buffered metrics: %s", e)
+
+    def _normalize_data_list(self, dataset: List[Tuple],
+                             timestamp: int) -> List[Tuple[str, int, int]]:
+        """
+            turn a dataset of (metric, value) or (metric, value, timestamp)
+            tuples into a list of (metric, value, timestamp) tuples.
+        """
+        return _normalize_data_list(dataset, timestamp)
 
     def _generate_message_for_data_list(
                 self, dataset: List[Tuple], timestamp: int,
                 generate_message_function: Callable[
-                        [List[Tuple[str, int, int]]], bytes
+                        [List[Tuple[str, int, int]]], Union[bytes, List]
                     ]
-            ) -> bytes:
+            ) -> Union[bytes, List]:
         """
             generate proper formatted message
             @param:
@@ -183,14 +642,46 @@ class AIOGraphite:
                 2)  dataset = [(metric1, value1, timestamp1),
                                (metric2, value2, timestamp2), ...]
         """
-        listofData = []
-        for data in dataset:
-            # unpack metric data
-            if len(data) == 2:
-                (metric, value) = data
-            else:
-                (metric, value, data_timestamp) = data
-                timestamp = data_timestamp
-            listofData.append((metric, value, timestamp))
+        listofData = self._normalize_data_list(dataset, timestamp)
         message = generate_message_function(listofData)
         return message
+
+
+class MetricHandle:
+    """
+    A metric registered on an AIOGraphite client with
+    AIOGraphite.metric, holding its name ready to be written (see
+    AIOGraphite.metric for when it is written as is).
+    """
+
+    __slots__ = ('name', 'count', '_client', '_prepared')
+
+    def __init__(self, client: AIOGraphite, name: str):
+        self.name = name
+        self.count = 0
+        self._client = client
+        self._prepared = client.protocol.prepare_metric(name)
+
+    async def send(self, value: int, timestamp: int=None) -> None:
+        """
+        send a single value of this metric.
+
+        args: value, timestamp. (int, int).
+        """
+        timestamp = int(timestamp or time.time())
+        client = self._client
+        if client._buffer is not None:
+            await client._enqueue(((self.name, value, timestamp),))
+            return
+        message = client._encode(1, client.protocol.generate_point_message,
+                                 self._prepared, value, timestamp)
+        await client._send_message(message, 1)
+
+    async def inc(self, amount: int=1, timestamp: int=None) -> None:
+        """
+        increment the running count of this metric, and send it.
+
+        args: amount, timestamp. (int, int).
+        """
+        self.count += amount
+        await self.send(self.count, timestamp)
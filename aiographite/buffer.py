@@ -0,0 +1,141 @@
+import random
+from collections import deque
+from typing import Tuple, List, Iterable
+
+
+# Rough per-point overhead on top of the metric name when estimating the
+# size of a buffered point on the wire: value, timestamp and separators.
+POINT_OVERHEAD_BYTES = 24
+
+# What to do with a new point once the buffer holds max_size points.
+OVERFLOW_BLOCK = 'block'
+OVERFLOW_DROP_NEWEST = 'drop_newest'
+OVERFLOW_DROP_OLDEST = 'drop_oldest'
+OVERFLOW_SAMPLE = 'sample'
+
+OVERFLOW_POLICIES = (
+    OVERFLOW_BLOCK,
+    OVERFLOW_DROP_NEWEST,
+    OVERFLOW_DROP_OLDEST,
+    OVERFLOW_SAMPLE,
+)
+
+
+def _point_size(metric: str) -> int:
+    return len(metric) + POINT_OVERHEAD_BYTES
+
+
+class MetricBuffer:
+    """
+    MetricBuffer is an in-memory buffer of (metric, value, timestamp)
+    tuples waiting to be flushed to graphite.
+
+    args: max_points, max_bytes, max_size, overflow_policy.
+
+    The buffer reports itself as full once max_points or max_bytes is
+    reached. The byte count is an estimate of the encoded size, not an
+    exact figure.
+
+    max_size bounds the number of points held in memory. Once it is
+    reached, overflow_policy decides what happens to new points:
+
+    * 'block': add() refuses the point; the caller is expected to wait
+      for a flush (see has_room) before adding more.
+    * 'drop_newest': the new point is discarded.
+    * 'drop_oldest': the oldest buffered point is discarded.
+    * 'sample': the buffer keeps a uniform random sample of every point
+      offered since the last drain (reservoir sampling).
+
+    Every discarded point is counted in dropped_points.
+    """
+
+    def __init__(self, max_points: int=None, max_bytes: int=None,
+                 max_size: int=None, overflow_policy: str=OVERFLOW_BLOCK):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(
+                f"Unsupported overflow policy {overflow_policy!r}, "
+                f"expected one of {OVERFLOW_POLICIES}")
+        self.max_points = max_points
+        self.max_bytes = max_bytes
+        self.max_size = max_size
+        self.overflow_policy = overflow_policy
+        self.dropped_points = 0
+        # reservoir sampling replaces random points, which is O(1) in a
+        # list but O(n) in a deque
+        if overflow_policy == OVERFLOW_SAMPLE:
+            self._points = []
+        else:
+            self._points = deque()
+        self._bytes = 0
+        self._offered = 0
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    @property
+    def size_in_bytes(self) -> int:
+        return self._bytes
+
+    def has_room(self) -> bool:
+        """
+        Whether a new point can be added without overflowing max_size.
+        """
+        return not self.max_size or len(self._points) < self.max_size
+
+    def add(self, metric: str, value: int, timestamp: int) -> bool:
+        """
+        Append a single point to the buffer.
+
+        Returns False if the point was refused by the 'block' policy.
+        """
+        self._offered += 1
+        if self.has_room():
+            self._points.append((metric, value, timestamp))
+            self._bytes += _point_size(metric)
+            return True
+        policy = self.overflow_policy
+        if policy == OVERFLOW_BLOCK:
+            self._offered -= 1
+            return False
+        self.dropped_points += 1
+        if policy == OVERFLOW_DROP_OLDEST:
+            self._bytes -= _point_size(self._points.popleft()[0])
+            self._points.append((metric, value, timestamp))
+            self._bytes += _point_size(metric)
+        elif policy == OVERFLOW_SAMPLE:
+            index = random.randrange(self._offered)
+            if index < len(self._points):
+                self._bytes -= _point_size(self._points[index][0])
+                self._points[index] = (metric, value, timestamp)
+                self._bytes += _point_size(metric)
+        return True
+
+    def extend(self, points: Iterable[Tuple[str, int, int]]) -> None:
+        """
+        Append a list of (metric, value, timestamp) tuples to the buffer.
+
+        Points refused by the 'block' policy are counted as dropped.
+        """
+        for metric, value, timestamp in points:
+            if not self.add(metric, value, timestamp):
+                self.dropped_points += 1
+
+    def is_full(self) -> bool:
+        """
+        Whether any of the configured thresholds has been reached.
+        """
+        if self.max_points and len(self._points) >= self.max_points:
+            return True
+        if self.max_bytes and self._bytes >= self.max_bytes:
+            return True
+        return not self.has_room()
+
+    def drain(self) -> List[Tuple[str, int, int]]:
+        """
+        Remove and return every buffered point.
+        """
+        points = list(self._points)
+        self._points.clear()
+        self._bytes = 0
+        self._offered = 0
+        return points
@@ -0,0 +1,98 @@
+import random
+import time
+
+
+class Backoff:
+    """
+    Backoff computes jittered, exponentially growing delays.
+
+    args: base, the first delay in seconds; maximum, the largest delay;
+    factor, the growth factor between consecutive delays; jitter, whether
+    to pick each delay at random between half and all of its nominal
+    value, so that many clients do not retry in lockstep.
+    """
+
+    def __init__(self, base: float=0.1, maximum: float=30.0,
+                 factor: float=2.0, jitter: bool=True):
+        self.base = base
+        self.maximum = maximum
+        self.factor = factor
+        self.jitter = jitter
+        self.attempts = 0
+
+    def next_delay(self) -> float:
+        """
+        Returns the delay to wait before the next attempt.
+        """
+        delay = min(self.maximum, self.base * self.factor ** self.attempts)
+        self.attempts += 1
+        if self.jitter:
+            delay = random.uniform(delay / 2, delay)
+        return delay
+
+    def reset(self) -> None:
+        self.attempts = 0
+
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """
+    CircuitBreaker stops sending to a graphite server that keeps failing.
+
+    args: failure_threshold, the number of consecutive failed sends
+    opening the circuit; backoff, a Backoff giving how long the circuit
+    stays open, growing every time a probe fails.
+
+    * closed: sends go through.
+    * open: sends are short-circuited without touching the network.
+    * half_open: once the backoff delay has elapsed, a single probe tries
+      to reconnect while sends are still short-circuited; its success
+      closes the circuit, its failure opens it again for a longer delay.
+    """
+
+    def __init__(self, failure_threshold: int=5, backoff: Backoff=None):
+        self.failure_threshold = failure_threshold
+        self.backoff = backoff or Backoff(base=1.0, maximum=60.0)
+        self.state = CLOSED
+        self.failures = 0
+        self._open_until = 0.0
+
+    @property
+    def retry_after(self) -> float:
+        """
+        Seconds left before a probe may be attempted.
+        """
+        return max(0.0, self._open_until - time.monotonic())
+
+    def allow_request(self) -> bool:
+        """
+        Whether a send may go through now.
+        """
+        return self.state == CLOSED
+
+    def begin_probe(self) -> bool:
+        """
+        Switch an open circuit to half-open if its delay has elapsed.
+
+        Returns whether the caller should probe the server, and then
+        report the outcome with record_success or record_failure.
+        """
+        if self.state != OPEN or time.monotonic() < self._open_until:
+            return False
+        self.state = HALF_OPEN
+        return True
+
+    def record_success(self) -> None:
+        self.state = CLOSED
+        self.failures = 0
+        self.backoff.reset()
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = OPEN
+            self._open_until = time.monotonic() + self.backoff.next_delay()
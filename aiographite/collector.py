@@ -0,0 +1,287 @@
+import asyncio
+import atexit
+import contextlib
+import logging
+import os
+import socket
+import threading
+import time
+from aiographite.aggregator import Aggregator, DEFAULT_PERCENTILES
+from aiographite.protocol import _number
+from typing import Tuple, Hashable
+
+
+"""
+    Metric collection for pre-fork servers.
+
+    Worker processes send events with a CollectorClient, as StatsD lines
+    ("<metric>:<value>|<type>", type being c, g, ms or s) in Unix domain
+    datagrams. A single Collector process receives them, merges them in
+    an Aggregator, and ships the aggregated points through one client,
+    so that carbon sees one connection and one series per metric instead
+    of one per worker.
+
+    Metric names must not contain ':', '|' or newlines.
+"""
+
+logger = logging.getLogger(__name__)
+
+COUNTER = b'c'
+GAUGE = b'g'
+TIMER = b'ms'
+SET = b's'
+
+
+DEFAULT_DATAGRAM_SIZE = 8192
+
+
+class CollectorClient:
+    """
+    CollectorClient sends events from a worker process to a Collector.
+
+    args: path, the Unix socket path the Collector listens on;
+    max_datagram_size; flush_interval, the maximum number of seconds an
+    event waits to be packed with the following ones, or None to send
+    every event in its own datagram.
+
+    Events are packed into datagrams of at most max_datagram_size bytes,
+    since Linux only queues a few datagrams (net.unix.max_dgram_qlen, 10
+    by default) per socket. A datagram is sent once full, or at the
+    latest flush_interval seconds after its first event, by a background
+    thread, so that the events of a worker going idle are not held back.
+    Pending events are also sent when the process exits normally.
+
+    Sending never blocks: events sent while the collector is down, or
+    while its receive queue is full, are dropped and counted in dropped.
+    A client created before forking can be used by every worker.
+    """
+
+    def __init__(self, path: str,
+                 max_datagram_size: int=DEFAULT_DATAGRAM_SIZE,
+                 flush_interval: float=1.0):
+        self.path = path
+        self.max_datagram_size = max_datagram_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._socket.setblocking(False)
+        self._lines = []
+        self._size = 0
+        self._started = 0.0
+        self._lock = threading.Lock()
+        # set while events wait to be packed, for the flush thread
+        self._pending = threading.Event()
+        self._closed = threading.Event()
+        self._thread = None
+        self._pid = os.getpid()
+        atexit.register(self.flush)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, tb):
+        self.close()
+
+    def incr(self, metric: str, value: float=1) -> None:
+        """
+        Increment a counter.
+        """
+        self._send(metric, value, 'c')
+
+    def gauge(self, metric: str, value: float) -> None:
+        """
+        Set a gauge.
+        """
+        self._send(metric, value, 'g')
+
+    def timing(self, metric: str, value: float) -> None:
+        """
+        Record a duration, in milliseconds.
+        """
+        self._send(metric, value, 'ms')
+
+    @contextlib.contextmanager
+    def timer(self, metric: str):
+        """
+        Record the duration of the wrapped block, in milliseconds.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timing(metric, (time.perf_counter() - start) * 1000)
+
+    def set_add(self, metric: str, member: Hashable) -> None:
+        """
+        Add a member to a set, counting distinct members.
+        """
+        self._send(metric, member, 's')
+
+    def flush(self) -> None:
+        """
+        Send the events waiting to be packed.
+        """
+        with self._lock:
+            self._flush()
+
+    def close(self) -> None:
+        """
+        Send the events waiting to be packed, and close the socket.
+        """
+        atexit.unregister(self.flush)
+        self._closed.set()
+        self._pending.set()
+        self.flush()
+        self._socket.close()
+
+    def _flush(self) -> None:
+        if not self._lines:
+            return
+        lines, self._lines, self._size = self._lines, [], 0
+        try:
+            self._socket.sendto(b'\n'.join(lines), self.path)
+        except OSError:
+            self.dropped += len(lines)
+
+    def _send(self, metric: str, value, kind: str) -> None:
+        if self._pid != os.getpid():
+            # forked: the events waiting belong to the parent process, and
+            # its flush thread and lock holder did not survive the fork
+            self._lines, self._size = [], 0
+            self._lock = threading.Lock()
+            self._pending = threading.Event()
+            self._thread = None
+            self._pid = os.getpid()
+        line = ("%s:%s|%s" % (metric, value, kind)).encode('utf-8')
+        with self._lock:
+            if self._size + len(line) + 1 > self.max_datagram_size:
+                self._flush()
+            if not self._lines:
+                self._started = time.monotonic()
+                if self.flush_interval is not None:
+                    self._start_flush_thread()
+                    self._pending.set()
+            self._lines.append(line)
+            self._size += len(line) + 1
+            if self.flush_interval is None or \
+                    time.monotonic() - self._started >= self.flush_interval:
+                self._flush()
+
+    def _start_flush_thread(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._flush_periodically,
+                name='aiographite-collector-client', daemon=True)
+            self._thread.start()
+
+    def _flush_periodically(self) -> None:
+        """
+            flush thread sending every datagram at the latest
+            flush_interval seconds after its first event, until the
+            client is closed.
+        """
+        while not self._closed.is_set():
+            self._pending.wait()
+            with self._lock:
+                if not self._lines:
+                    self._pending.clear()
+                    continue
+                deadline = self._started + self.flush_interval
+                delay = deadline - time.monotonic()
+                if delay <= 0:
+                    self._flush()
+                    continue
+            self._closed.wait(delay)
+
+
+class Collector(asyncio.DatagramProtocol):
+    """
+    Collector receives the events of CollectorClients on a Unix datagram
+    socket, and aggregates them with an Aggregator flushing through
+    client every interval seconds.
+
+    args: path, the Unix socket path to listen on; client, an AIOGraphite
+    or AIOGraphitePool; interval, percentiles, and any extra keyword
+    arguments are passed on to the Aggregator.
+
+    Events received are counted in received, and lines that cannot be
+    parsed in malformed.
+
+    example:
+
+    .. code:: python
+
+        async with Collector('/run/app/metrics.sock', pool):
+            await stopped.wait()
+    """
+
+    def __init__(self, path: str, client, interval: float=10,
+                 percentiles: Tuple[float, ...]=DEFAULT_PERCENTILES,
+                 **kwargs):
+        self.path = path
+        self.aggregator = Aggregator(client, interval, percentiles, **kwargs)
+        self.received = 0
+        self.malformed = 0
+        self._transport = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, tb):
+        await self.stop()
+
+    async def start(self) -> None:
+        """
+        Listen on path, replacing a stale socket file, and start
+        flushing every interval seconds.
+        """
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(self.path)
+        loop = asyncio.get_running_loop()
+        self._transport, _ = await loop.create_datagram_endpoint(
+            lambda: self, local_addr=self.path, family=socket.AF_UNIX)
+        self.aggregator.start()
+
+    async def stop(self) -> None:
+        """
+        Stop listening, and flush what has been aggregated.
+        """
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(self.path)
+        await self.aggregator.stop()
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        for line in data.split(b'\n'):
+            if line:
+                self._process(line)
+
+    def _process(self, line: bytes) -> None:
+        body, _, kind = line.rpartition(b'|')
+        try:
+            if kind == SET:
+                metric, _, value = body.partition(b':')
+            else:
+                metric, _, value = body.rpartition(b':')
+                value = _number(value)
+            metric = metric.decode('utf-8')
+            if not metric:
+                raise ValueError(line)
+            if kind == COUNTER:
+                self.aggregator.incr(metric, value)
+            elif kind == GAUGE:
+                self.aggregator.gauge(metric, value)
+            elif kind == TIMER:
+                self.aggregator.timing(metric, value)
+            elif kind == SET:
+                self.aggregator.set_add(metric, value)
+            else:
+                raise ValueError(kind)
+        except ValueError:
+            self.malformed += 1
+            logger.debug("Malformed collector line: %r", line)
+            return
+        self.received += 1
@@ -0,0 +1,2 @@
+class AioGraphiteSendException(Exception):
+    pass
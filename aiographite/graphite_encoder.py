@@ -1,7 +1,10 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 
+import re
+import threading
 import urllib.parse
+from collections import OrderedDict, namedtuple
 
 """
     Naming metrics schema:
@@ -42,6 +45,74 @@ import urllib.parse
 """
 
 
+"""
+    Performance:
+
+    Metric names are usually drawn from a small, highly repetitive set, so
+    encoded parts and fully joined names are memoized in bounded LRU
+    caches. Parts made only of characters that punycode and URL quoting
+    leave untouched skip both: their encoding is the part itself followed
+    by the punycode delimiter '-'.
+"""
+
+DEFAULT_CACHE_SIZE = 10000
+
+_ASCII_SAFE_PART = re.compile(r'[A-Za-z0-9_~/-]+')
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+
+class LRUCache:
+    """
+    A bounded mapping evicting its least recently used entry, and keeping
+    hit/miss counts.
+
+    The caches are shared by every thread of the process (the sender
+    thread of ThreadedAIOGraphite, GraphiteClient users...), so reads and
+    updates hold a lock. Values are computed outside of it.
+    """
+
+    def __init__(self, maxsize=DEFAULT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, compute):
+        """
+        Return the cached value of key, computing it with compute(key) on
+        a miss.
+        """
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._data.move_to_end(key)
+                return value
+        value = compute(key)
+        if self.maxsize > 0:
+            with self._lock:
+                self._data[key] = value
+                if len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self._data.clear()
+
+    def info(self):
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.maxsize,
+                             len(self._data))
+
+
 class GraphiteEncoder:
     """
     Graphite expects everything to be just ASCII to split/processing them,
@@ -55,6 +126,9 @@ class GraphiteEncoder:
     <section_name>.<section_name>.<section_name>.<section_name>
     """
 
+    _encoded_parts = LRUCache()
+    _joined_names = LRUCache()
+
     @staticmethod
     def encode(section_name):
         """
@@ -65,6 +139,13 @@ class GraphiteEncoder:
 
         returns valid metric name for graphite
         """
+        if _ASCII_SAFE_PART.fullmatch(section_name):
+            return section_name + "-"
+        return GraphiteEncoder._encoded_parts.get(
+            section_name, GraphiteEncoder._encode)
+
+    @staticmethod
+    def _encode(section_name):
         valid_graphite_metric_name = ""
         try:
             valid_graphite_metric_name = urllib.parse\
@@ -73,6 +154,50 @@ class GraphiteEncoder:
             raise e
         return valid_graphite_metric_name
 
+    @staticmethod
+    def join_metric_parts(metric_parts):
+        """
+        This method helps to encode every part of a metric name and join
+        them into a valid graphite metric name.
+
+        args: a list of metric parts(string).
+
+        returns valid metric name for graphite
+        """
+        return GraphiteEncoder._joined_names.get(
+            tuple(metric_parts), GraphiteEncoder._join)
+
+    @staticmethod
+    def _join(metric_parts):
+        return ".".join([
+            GraphiteEncoder.encode(dir_name) for dir_name in metric_parts
+        ])
+
+    @staticmethod
+    def configure_cache(maxsize=DEFAULT_CACHE_SIZE, names_maxsize=None):
+        """
+        Resize (and clear) the caches of encoded parts and joined names.
+
+        args: maxsize, the number of encoded parts kept; names_maxsize,
+        the number of joined names kept, defaults to maxsize. A size of
+        0 disables the cache.
+        """
+        if names_maxsize is None:
+            names_maxsize = maxsize
+        GraphiteEncoder._encoded_parts = LRUCache(maxsize)
+        GraphiteEncoder._joined_names = LRUCache(names_maxsize)
+
+    @staticmethod
+    def cache_info():
+        """
+        returns hit/miss statistics of the caches, as a dict of CacheInfo
+        named tuples keyed by 'parts' and 'names'.
+        """
+        return {
+            'parts': GraphiteEncoder._encoded_parts.info(),
+            'names': GraphiteEncoder._joined_names.info(),
+        }
+
     @staticmethod
     def decode(idna_str):
         """
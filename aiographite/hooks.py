@@ -0,0 +1,53 @@
+"""
+    Profiling hooks around the encode and send phases of a client.
+"""
+
+
+class ClientHooks:
+    """
+    ClientHooks is called by AIOGraphite around each phase of sending a
+    message. Every method does nothing: subclass it and override the
+    phases of interest, then pass an instance as the hooks argument.
+
+    Hooks run synchronously on the sending path, so keep them cheap: a
+    counter or histogram update, not I/O. Durations are in seconds,
+    measured with time.perf_counter.
+    """
+
+    def pre_encode(self, points: int) -> None:
+        """
+        Called before encoding a message of points points.
+        """
+
+    def post_encode(self, points: int, size: int, elapsed: float) -> None:
+        """
+        Called after encoding a message of points points into size bytes,
+        which took elapsed seconds.
+        """
+
+    def pre_write(self, points: int, size: int) -> None:
+        """
+        Called before writing a message of points points and size bytes
+        to the transport.
+        """
+
+    def post_drain(self, points: int, size: int, elapsed: float) -> None:
+        """
+        Called once a message has been written and drained, which took
+        elapsed seconds, retries included.
+        """
+
+    def on_retry(self, attempt: int, error: Exception) -> None:
+        """
+        Called when a write fails, before reconnecting to try again.
+        attempt is 1 for the first failed write.
+        """
+
+    def on_drop(self, points: int, reason: str) -> None:
+        """
+        Called when points are discarded: reason is 'queue_full' when
+        the send queue overflowed, 'circuit_open' when the circuit
+        breaker short-circuited a message and there is no spool,
+        'spool_failed' when the spool could not store a message. points
+        is 0 when unknown, e.g. for a message sent by an AIOGraphitePool.
+        """
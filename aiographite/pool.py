@@ -0,0 +1,196 @@
+import asyncio
+import logging
+import time
+from aiographite.aiographite import (
+    AIOGraphite, AioGraphiteSendException, DEFAULT_GRAPHITE_PLAINTEXT_PORT,
+    _normalize_data_list
+)
+from aiographite.protocol import PlaintextProtocol
+from typing import Tuple, List
+
+
+logger = logging.getLogger(__name__)
+
+
+async def connect_pool(endpoints, size=4, protocol=PlaintextProtocol(),
+                       **kwargs):
+    """
+    A factory for connecting a pool of connections to Graphite Server(s).
+
+    args: endpoints, size, protocol. Any extra keyword arguments are
+    passed on to AIOGraphitePool.
+
+    Returns an instantiated AIOGraphitePool.
+    """
+    pool = AIOGraphitePool(endpoints, size, protocol, **kwargs)
+    await pool.connect()
+    return pool
+
+
+class AIOGraphitePool:
+    """
+    AIOGraphitePool maintains a pool of AIOGraphite connections to one or
+    several graphite servers, so that concurrent sends are written in
+    parallel rather than serialized over a single TCP stream.
+
+    args: endpoints, a list of (host, port) tuples or host names; size,
+    the total number of connections, spread round-robin over endpoints;
+    protocol; timeout; reconnect_interval, seconds between reconnect
+    attempts for a failed connection; connect_timeout.
+
+    Each batch goes to the healthy connection with the fewest bytes in
+    flight. A connection that fails to send is taken out of rotation and
+    reconnected in the background.
+    """
+
+    def __init__(self, endpoints, size=4, protocol=PlaintextProtocol(),
+                 timeout=None, reconnect_interval=1.0,
+                 connect_timeout=None):
+        if not endpoints:
+            raise AioGraphiteSendException("No graphite endpoint provided!")
+        addresses = []
+        for endpoint in endpoints:
+            if isinstance(endpoint, str):
+                endpoint = (endpoint, DEFAULT_GRAPHITE_PLAINTEXT_PORT)
+            addresses.append(endpoint)
+        self.protocol = protocol
+        self._reconnect_interval = reconnect_interval
+        self._members = [
+            AIOGraphite(*addresses[i % len(addresses)],
+                        protocol=protocol, timeout=timeout,
+                        connect_timeout=connect_timeout)
+            for i in range(max(size, len(addresses)))
+        ]
+        self._in_flight = {member: 0 for member in self._members}
+        self._healthy = set()
+        self._reconnect_tasks = {}
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, tb):
+        await self.close()
+
+    @property
+    def healthy_size(self) -> int:
+        """
+        Number of connections currently in rotation.
+        """
+        return len(self._healthy)
+
+    async def connect(self) -> None:
+        """
+        Open every connection of the pool. Connections that cannot be
+        opened are retried in the background; raises
+        AioGraphiteSendException only if none of them could be opened.
+        """
+        results = await asyncio.gather(
+            *[member._connect() for member in self._members],
+            return_exceptions=True)
+        for member, result in zip(self._members, results):
+            if isinstance(result, Exception):
+                self._mark_failed(member)
+            else:
+                self._healthy.add(member)
+        if not self._healthy:
+            raise AioGraphiteSendException(
+                "Unable to connect to any graphite endpoint of the pool!")
+
+    async def send(self, metric: str, value: int, timestamp: int=None) -> None:
+        """
+        send a single metric.
+
+        args: metric, value, timestamp. (str, int, int).
+        """
+        if not metric:
+            return
+        timestamp = int(timestamp or time.time())
+        message = self.protocol.generate_message([(metric, value, timestamp)])
+        await self._send_message(message)
+
+    async def send_multiple(self, dataset: List[Tuple],
+                            timestamp: int=None) -> None:
+        """
+        send a list of tuples.
+
+        args: a list of tuples (metric, value, timestamp), and timestamp
+        is optional.
+        """
+        if not dataset:
+            return
+        timestamp = int(timestamp or time.time())
+        message = self.protocol.generate_message(
+            _normalize_data_list(dataset, timestamp))
+        await self._send_message(message)
+
+    async def send_columns(self, metrics, values, timestamps=None) -> None:
+        """
+        send parallel columns of metrics and values.
+
+        args: metrics, values, timestamps. See AIOGraphite.send_columns.
+        """
+        if len(metrics) == 0:
+            return
+        if timestamps is None or not hasattr(timestamps, '__len__'):
+            timestamps = int(timestamps or time.time())
+        message = self.protocol.generate_message_from_columns(
+            metrics, values, timestamps)
+        await self._send_message(message)
+
+    async def close(self) -> None:
+        """
+        Stop reconnecting and close every connection of the pool.
+        """
+        for task in self._reconnect_tasks.values():
+            task.cancel()
+        self._reconnect_tasks = {}
+        self._healthy = set()
+        for member in self._members:
+            await member.close()
+
+    async def _send_message(self, message: bytes) -> None:
+        """
+            send the message over the least loaded healthy connection,
+            falling back to the next one if it fails.
+        """
+        while self._healthy:
+            member = min(self._healthy, key=self._in_flight.__getitem__)
+            self._in_flight[member] += len(message)
+            try:
+                await member._send_message(message)
+                return
+            except AioGraphiteSendException:
+                self._mark_failed(member)
+            finally:
+                self._in_flight[member] -= len(message)
+        raise AioGraphiteSendException(
+            "No healthy graphite connection available in the pool!")
+
+    def _mark_failed(self, member: AIOGraphite) -> None:
+        """
+            take a connection out of rotation and reconnect it in the
+            background.
+        """
+        self._healthy.discard(member)
+        if member not in self._reconnect_tasks:
+            self._reconnect_tasks[member] = asyncio.ensure_future(
+                self._reconnect(member))
+
+    async def _reconnect(self, member: AIOGraphite) -> None:
+        """
+            background task trying to reconnect a failed connection every
+            reconnect_interval seconds.
+        """
+        while True:
+            await asyncio.sleep(self._reconnect_interval)
+            try:
+                await member._disconnect()
+                await member._connect()
+            except AioGraphiteSendException as e:
+                logger.debug("Reconnect to %s failed: %s",
+                             member._graphite_server_address, e)
+                continue
+            del self._reconnect_tasks[member]
+            self._healthy.add(member)
+            return
@@ -1,8 +1,56 @@
 from typing import Tuple, List
+import io
 import pickle
 import struct
 
 
+# One plaintext line: "<metric> <value> <timestamp>\n". Formatting whole
+# tuples with this template is byte-identical to _format_data, and avoids
+# the intermediate list, join and concatenation per point.
+PLAINTEXT_LINE = "%s %s %s\n"
+
+# carbon's PICKLE_RECEIVER_MAX_LENGTH: carbon drops the connection when a
+# pickle frame payload is larger than this.
+MAX_PICKLE_FRAME_BYTES = 2 ** 20
+
+# Number of points pickled to estimate the size of a point when
+# splitting a large batch into frames.
+_FRAME_SIZE_SAMPLE = 100
+
+
+def _as_list(column):
+    """
+    Turn a column (list, tuple, array.array, NumPy array...) into a
+    sequence of plain Python objects, whose str() matches the one of
+    the equivalent Python values.
+    """
+    tolist = getattr(column, 'tolist', None)
+    if tolist is not None:
+        return tolist()
+    return column
+
+
+def _number(value: bytes):
+    """
+    Parse a value received as text, keeping integers integral.
+    """
+    try:
+        return int(value)
+    except ValueError:
+        return float(value)
+
+
+def _is_scalar(value) -> bool:
+    return not hasattr(value, '__len__')
+
+
+def _check_column_lengths(metrics, values, timestamps) -> None:
+    if len(metrics) != len(values) or (
+            not _is_scalar(timestamps) and len(timestamps) != len(metrics)):
+        raise ValueError("metrics, values and timestamps columns "
+                         "must have the same length")
+
+
 class PlaintextProtocol:
 
     def _format_data(self, metric: str, value: int, timestamp: int) -> str:
@@ -22,13 +70,100 @@ class PlaintextProtocol:
 
         args: a list of tuples (metric, value, timestamp).
         """
-        listOfPlaintext = []
-        for metric, value, timestamp in listOfTuples:
-            listOfPlaintext.append(self._format_data(metric, value, timestamp))
+        line = PLAINTEXT_LINE
+        if not isinstance(listOfTuples, (list, tuple)):
+            # the fallback below iterates a second time
+            listOfTuples = list(listOfTuples)
+        try:
+            listOfPlaintext = [line % data for data in listOfTuples]
+        except TypeError:
+            # Not a list of 3-tuples (e.g. lists), unpack each item.
+            listOfPlaintext = [
+                line % (metric, value, timestamp)
+                for metric, value, timestamp in listOfTuples
+            ]
         return "".join(listOfPlaintext).encode('ascii')
 
+    def generate_buffers(self,
+                         listOfTuples: List[Tuple[str, int, int]]) -> List:
+        """
+        Same as generate_message, but returns a list of buffers to be
+        written one after another. Plaintext messages are a single
+        buffer.
+
+        args: a list of tuples (metric, value, timestamp).
+        """
+        return [self.generate_message(listOfTuples)]
+
+    def generate_message_from_columns(self, metrics, values,
+                                      timestamps) -> bytes:
+        """
+        This method helps generate message with proper format for
+        plaintext protocol from parallel columns, without building a
+        list of tuples first.
+
+        args: metrics, values, timestamps. Columns can be lists,
+        tuples, array.array or NumPy arrays; timestamps can also be a
+        single timestamp shared by every point.
+        """
+        metrics, values = _as_list(metrics), _as_list(values)
+        _check_column_lengths(metrics, values, timestamps)
+        if _is_scalar(timestamps):
+            line = "%s %s " + str(timestamps) + "\n"
+            listOfPlaintext = [line % data for data in zip(metrics, values)]
+        else:
+            line = PLAINTEXT_LINE
+            listOfPlaintext = [
+                line % data
+                for data in zip(metrics, values, _as_list(timestamps))
+            ]
+        return "".join(listOfPlaintext).encode('ascii')
+
+    def prepare_metric(self, metric: str) -> bytes:
+        """
+        Encode a metric name once, ahead of generate_point_message.
+        """
+        return (metric + " ").encode('ascii')
+
+    def generate_point_message(self, prepared_metric: bytes, value: int,
+                               timestamp: int) -> bytes:
+        """
+        This method helps generate message for a single point whose
+        metric name was encoded by prepare_metric.
+        """
+        return prepared_metric + ("%s %s\n" % (value, timestamp)).encode(
+            'ascii')
+
+
+def _frame_size(frame: List) -> int:
+    """
+    Payload size of a frame given as a list of buffers.
+    """
+    return sum(len(buffer) for buffer in frame) - 4
+
 
 class PickleProtocol:
+    """
+    args: memo, max_frame_points, max_frame_bytes.
+
+    With memo=False, frames are pickled without a memo: no PUT opcode
+    per string and tuple, which makes encoding several times faster and
+    frames about a quarter smaller. The output is still a protocol 2
+    pickle of the same list, accepted by carbon's unpickler, but not
+    byte-identical to the default encoding.
+
+    Batches are split into several consecutive frames holding at most
+    max_frame_points points, and whose payload is at most
+    max_frame_bytes (carbon's default PICKLE_RECEIVER_MAX_LENGTH). A
+    single point larger than max_frame_bytes still gets its own frame.
+    Set either limit to None to disable it.
+    """
+
+    def __init__(self, memo: bool=True, max_frame_points: int=None,
+                 max_frame_bytes: int=MAX_PICKLE_FRAME_BYTES):
+        self.memo = memo
+        self.max_frame_points = max_frame_points
+        self.max_frame_bytes = max_frame_bytes
 
     def _format_data(self, metric: str,
                      value: int,
@@ -48,12 +183,137 @@ class PickleProtocol:
 
         args: a list of tuples (metric, value, timestamp).
         """
+        return b"".join(self.generate_buffers(listOfTuples))
+
+    def generate_buffers(self,
+                         listOfTuples: List[Tuple[str, int, int]]) -> List:
+        """
+        Same as generate_message, but returns the header and payload of
+        every frame as separate buffers to be written one after another,
+        instead of copying them into a single message.
+
+        args: a list of tuples (metric, value, timestamp).
+        """
+        if not self.memo:
+            return self._pack_buffers([
+                (metric, (timestamp, value))
+                for metric, value, timestamp in listOfTuples
+            ])
         listOfTargetTuples = []
         for metric, value, timestamp in listOfTuples:
             listOfTargetTuples.append(
                     self._format_data(metric, value, timestamp)
                 )
+        return self._pack_buffers(listOfTargetTuples)
+
+    def generate_message_from_columns(self, metrics, values,
+                                      timestamps) -> bytes:
+        """
+        This method helps generate message with proper format for
+        pickle protocol from parallel columns, without building a
+        list of (metric, value, timestamp) tuples first.
+
+        args: metrics, values, timestamps. Columns can be lists,
+        tuples, array.array or NumPy arrays; timestamps can also be a
+        single timestamp shared by every point.
+        """
+        metrics, values = _as_list(metrics), _as_list(values)
+        _check_column_lengths(metrics, values, timestamps)
+        if _is_scalar(timestamps):
+            listOfTargetTuples = [
+                (metric, (timestamps, value))
+                for metric, value in zip(metrics, values)
+            ]
+        else:
+            listOfTargetTuples = [
+                (metric, (timestamp, value))
+                for metric, value, timestamp
+                in zip(metrics, values, _as_list(timestamps))
+            ]
+        return self._pack(listOfTargetTuples)
+
+    def prepare_metric(self, metric: str) -> str:
+        """
+        Encode a metric name once, ahead of generate_point_message.
+        Pickle frames embed the name as is.
+        """
+        return metric
+
+    def generate_point_message(self, prepared_metric: str, value: int,
+                               timestamp: int) -> bytes:
+        """
+        This method helps generate message for a single point whose
+        metric name was encoded by prepare_metric.
+        """
+        return self._pack([(prepared_metric, (timestamp, value))])
+
+    def _pack(self, listOfTargetTuples: List[Tuple]) -> bytes:
+        """
+        @return: consecutive length-prefixed pickle frames of the target
+                 tuples, split according to max_frame_points and
+                 max_frame_bytes
+        """
+        return b"".join(self._pack_buffers(listOfTargetTuples))
+
+    def _pack_buffers(self, listOfTargetTuples: List[Tuple]) -> List:
+        buffers = []
+        frame_points = self._frame_points(listOfTargetTuples)
+        if len(listOfTargetTuples) <= frame_points:
+            self._pack_chunk(listOfTargetTuples, buffers)
+            return buffers
+        for start in range(0, len(listOfTargetTuples), frame_points):
+            self._pack_chunk(
+                listOfTargetTuples[start:start + frame_points], buffers)
+        return buffers
+
+    def _frame_points(self, listOfTargetTuples: List[Tuple]) -> int:
+        """
+        @return: the number of points per frame, estimated from the size
+                 of the first points when max_frame_bytes is set
+        """
+        frame_points = len(listOfTargetTuples)
+        if self.max_frame_points:
+            frame_points = min(frame_points, self.max_frame_points)
+        if self.max_frame_bytes and frame_points > _FRAME_SIZE_SAMPLE:
+            sample = listOfTargetTuples[:_FRAME_SIZE_SAMPLE]
+            point_bytes = _frame_size(self._pack_frame(sample)) / len(sample)
+            # keep some headroom, frames exceeding it are split again
+            frame_points = min(frame_points, max(
+                1, int(self.max_frame_bytes * 0.9 / point_bytes)))
+        return frame_points
+
+    def _pack_chunk(self, chunk: List[Tuple], buffers: List) -> None:
+        frame = self._pack_frame(chunk)
+        if (self.max_frame_bytes and len(chunk) > 1 and
+                _frame_size(frame) > self.max_frame_bytes):
+            middle = len(chunk) // 2
+            self._pack_chunk(chunk[:middle], buffers)
+            self._pack_chunk(chunk[middle:], buffers)
+        else:
+            buffers.extend(frame)
+
+    def _pack_frame(self, listOfTargetTuples: List[Tuple]) -> List:
+        """
+        @return: the buffers of a length-prefixed pickle frame of the
+                 target tuples
+        """
+        if not self.memo:
+            return [self._pack_without_memo(listOfTargetTuples)]
         payload = pickle.dumps(listOfTargetTuples, protocol=2)
         header = struct.pack("!L", len(payload))
-        message = header + payload
-        return message
+        return [header, payload]
+
+    def _pack_without_memo(self, listOfTargetTuples: List[Tuple]):
+        """
+        @return: a length-prefixed, memo-free pickle frame, pickled right
+                 after a placeholder header in the same buffer, as a
+                 memoryview of that buffer
+        """
+        buffer = io.BytesIO()
+        buffer.write(b"\x00\x00\x00\x00")
+        pickler = pickle.Pickler(buffer, protocol=2)
+        pickler.fast = True
+        pickler.dump(listOfTargetTuples)
+        buffer.seek(0)
+        buffer.write(struct.pack("!L", buffer.getbuffer().nbytes - 4))
+        return buffer.getbuffer()
@@ -0,0 +1,211 @@
+import asyncio
+import bisect
+import time
+from hashlib import md5
+from aiographite.aiographite import (
+    AIOGraphite, AioGraphiteSendException, _normalize_data_list
+)
+from aiographite.protocol import PlaintextProtocol
+from typing import Tuple, List, Dict, Iterator
+
+
+"""
+    Client side sharding across several carbon-cache instances.
+
+    ConsistentHashRing is a port of carbon's own carbon_ch hashing ring
+    (carbon/hashing.py), and AIOGraphiteRouter follows the semantics of
+    carbon-relay's ConsistentHashingRouter, so that a metric is routed to
+    the same carbon-cache whether it goes through a relay or not.
+"""
+
+
+def parse_destination(destination) -> Tuple[str, int, str]:
+    """
+    Parse a carbon destination into a (host, port, instance) tuple.
+
+    args: a "host:port[:instance]" string, or a (host, port[, instance])
+    tuple.
+    """
+    if isinstance(destination, str):
+        parts = destination.split(":")
+        if len(parts) not in (2, 3):
+            raise AioGraphiteSendException(
+                f"Invalid destination {destination!r}, expected "
+                f"host:port[:instance]")
+        destination = parts
+    if len(destination) == 2:
+        host, port = destination
+        instance = None
+    else:
+        host, port, instance = destination
+    return (host, int(port), instance)
+
+
+class ConsistentHashRing:
+    """
+    ConsistentHashRing maps metric names to nodes exactly like carbon's
+    carbon_ch ring.
+
+    args: nodes, a list of (host, instance) keys; replica_count, the
+    number of positions of each node on the ring.
+    """
+
+    def __init__(self, nodes=(), replica_count: int=100):
+        self.ring = []
+        self.nodes = set()
+        self.replica_count = replica_count
+        self._positions = set()
+        for node in nodes:
+            self.add_node(node)
+
+    @staticmethod
+    def compute_ring_position(key: str) -> int:
+        return int(md5(key.encode('utf-8')).hexdigest()[:4], 16)
+
+    def add_node(self, key: Tuple[str, str]) -> None:
+        self.nodes.add(key)
+        for i in range(self.replica_count):
+            replica_key = "%s:%d" % (key, i)
+            position = self.compute_ring_position(replica_key)
+            while position in self._positions:
+                position = position + 1
+            self._positions.add(position)
+            bisect.insort(self.ring, (position, key))
+
+    def get_node(self, key: str) -> Tuple[str, str]:
+        position = self.compute_ring_position(key)
+        index = bisect.bisect_left(self.ring, (position, ())) % len(self.ring)
+        return self.ring[index][1]
+
+    def get_nodes(self, key: str) -> Iterator[Tuple[str, str]]:
+        """
+        Yield every distinct node, starting from the one owning key and
+        walking the ring clockwise.
+        """
+        if not self.ring:
+            return
+        if len(self.nodes) == 1:
+            yield next(iter(self.nodes))
+            return
+        nodes = set()
+        position = self.compute_ring_position(key)
+        index = bisect.bisect_left(self.ring, (position, ())) % len(self.ring)
+        last_index = (index - 1) % len(self.ring)
+        while len(nodes) < len(self.nodes) and index != last_index:
+            next_node = self.ring[index][1]
+            if next_node not in nodes:
+                nodes.add(next_node)
+                yield next_node
+            index = (index + 1) % len(self.ring)
+
+
+class AIOGraphiteRouter:
+    """
+    AIOGraphiteRouter shards metrics over several carbon-cache
+    destinations by metric name, without going through carbon-relay.
+
+    args: destinations, a list of "host:port[:instance]" strings or
+    (host, port[, instance]) tuples, as in carbon's DESTINATIONS setting;
+    protocol; replication_factor, the number of destinations receiving
+    each metric; diverse_replicas, whether replicas must land on
+    different hosts; timeout; connect_timeout.
+
+    Points are batched per destination and every batch is encoded once
+    with the configured protocol.
+    """
+
+    def __init__(self, destinations, protocol=PlaintextProtocol(),
+                 replication_factor: int=1, diverse_replicas: bool=False,
+                 timeout=None, connect_timeout=None):
+        if not destinations:
+            raise AioGraphiteSendException("No graphite destination provided!")
+        self.protocol = protocol
+        self.replication_factor = replication_factor
+        self.diverse_replicas = diverse_replicas
+        self.ring = ConsistentHashRing()
+        self._clients = {}
+        for destination in destinations:
+            host, port, instance = parse_destination(destination)
+            self.ring.add_node((host, instance))
+            self._clients[(host, instance)] = AIOGraphite(
+                host, port, protocol=protocol, timeout=timeout,
+                connect_timeout=connect_timeout)
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, tb):
+        await self.close()
+
+    def get_destinations(self, metric: str) -> Iterator[Tuple[str, str]]:
+        """
+        Yield the (host, instance) keys of the destinations of a metric.
+        """
+        if self.diverse_replicas:
+            used_hosts = set()
+            for (host, instance) in self.ring.get_nodes(metric):
+                if host in used_hosts:
+                    continue
+                used_hosts.add(host)
+                yield (host, instance)
+                if len(used_hosts) >= self.replication_factor:
+                    return
+        else:
+            for count, node in enumerate(self.ring.get_nodes(metric)):
+                if count == self.replication_factor:
+                    return
+                yield node
+
+    async def connect(self) -> None:
+        """
+        Connect to every destination.
+        """
+        await asyncio.gather(
+            *[client._connect() for client in self._clients.values()])
+
+    async def send(self, metric: str, value: int, timestamp: int=None) -> None:
+        """
+        send a single metric.
+
+        args: metric, value, timestamp. (str, int, int).
+        """
+        if not metric:
+            return
+        await self.send_multiple([(metric, value)], timestamp)
+
+    async def send_multiple(self, dataset: List[Tuple],
+                            timestamp: int=None) -> None:
+        """
+        send a list of tuples.
+
+        args: a list of tuples (metric, value, timestamp), and timestamp
+        is optional.
+        """
+        if not dataset:
+            return
+        timestamp = int(timestamp or time.time())
+        batches = self._shard(dataset, timestamp)
+        await asyncio.gather(*[
+            self._clients[node]._send_message(
+                self.protocol.generate_message(points))
+            for node, points in batches.items()
+        ])
+
+    async def close(self) -> None:
+        """
+        Close the connection to every destination.
+        """
+        for client in self._clients.values():
+            await client.close()
+
+    def _shard(self, dataset: List[Tuple],
+               timestamp: int) -> Dict[Tuple[str, str], List[Tuple]]:
+        """
+            group (metric, value, timestamp) tuples per destination.
+        """
+        batches = {}
+        for point in _normalize_data_list(dataset, timestamp):
+            for node in self.get_destinations(point[0]):
+                batches.setdefault(node, []).append(point)
+        return batches
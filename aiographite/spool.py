@@ -0,0 +1,216 @@
+import asyncio
+import os
+import struct
+import time
+from typing import Awaitable, Callable, Optional, Tuple
+
+
+"""
+    A write-ahead spool keeping encoded messages on disk while graphite is
+    unreachable.
+
+    Messages are appended to segment files, each record being a 4 bytes
+    big-endian length followed by the message, in the very format it
+    would have been sent. Segments are replayed oldest first and deleted
+    once fully replayed. The read position is only kept in memory, so
+    after a restart the oldest segment is replayed from its start: the
+    delivery guarantee is at-least-once.
+"""
+
+DEFAULT_SPOOL_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_SEGMENT_BYTES = 16 * 1024 * 1024
+
+EVICT_OLDEST = 'drop_oldest'
+EVICT_NEWEST = 'drop_newest'
+
+SEGMENT_SUFFIX = '.seg'
+
+_RECORD_HEADER = struct.Struct("!L")
+
+
+class DiskSpool:
+    """
+    DiskSpool persists encoded messages in append-only segment files, and
+    replays them in order.
+
+    args: directory; max_bytes, the disk usage limit of the spool;
+    segment_bytes, the size after which a new segment is started;
+    eviction, what to do when max_bytes is reached: 'drop_oldest'
+    deletes the oldest segments, 'drop_newest' refuses new messages;
+    replay_rate, the maximum number of bytes per second replayed (None
+    for no limit); fsync, whether to fsync after every append.
+
+    Dropped data is counted in dropped_bytes.
+    """
+
+    def __init__(self, directory: str,
+                 max_bytes: int=DEFAULT_SPOOL_MAX_BYTES,
+                 segment_bytes: int=DEFAULT_SEGMENT_BYTES,
+                 eviction: str=EVICT_OLDEST, replay_rate: float=None,
+                 fsync: bool=False):
+        if eviction not in (EVICT_OLDEST, EVICT_NEWEST):
+            raise ValueError(f"Unsupported eviction policy {eviction!r}")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.segment_bytes = segment_bytes
+        self.eviction = eviction
+        self.replay_rate = replay_rate
+        self.fsync = fsync
+        self.dropped_bytes = 0
+        self._segments = sorted(
+            int(name[:-len(SEGMENT_SUFFIX)])
+            for name in os.listdir(directory)
+            if name.endswith(SEGMENT_SUFFIX)
+        )
+        self._sizes = {
+            segment: os.path.getsize(self._path(segment))
+            for segment in self._segments
+        }
+        self._read_offset = 0
+        self._writer = None
+        self._reader = None
+
+    @property
+    def pending_bytes(self) -> int:
+        """
+        Number of bytes (records headers included) waiting to be replayed.
+        """
+        return sum(self._sizes.values()) - self._read_offset
+
+    def __bool__(self) -> bool:
+        return self.pending_bytes > 0
+
+    def append(self, message: bytes) -> bool:
+        """
+        Persist a message at the end of the spool.
+
+        Returns False if the message was dropped to honor max_bytes.
+        """
+        record_size = _RECORD_HEADER.size + len(message)
+        while self.max_bytes and \
+                self.pending_bytes + record_size > self.max_bytes:
+            if self.eviction == EVICT_NEWEST or not self._segments:
+                self.dropped_bytes += record_size
+                return False
+            self._evict_oldest()
+        writer = self._active_writer(record_size)
+        writer.write(_RECORD_HEADER.pack(len(message)))
+        writer.write(message)
+        writer.flush()
+        if self.fsync:
+            os.fsync(writer.fileno())
+        self._sizes[self._segments[-1]] += record_size
+        return True
+
+    def peek(self) -> Optional[Tuple[Tuple[int, int], bytes]]:
+        """
+        Returns the position and the content of the oldest record, or
+        None if the spool is empty.
+
+        An incomplete record, which a crash in the middle of an append
+        can leave at the end of a segment, is skipped along with the rest
+        of its segment, and counted in dropped_bytes.
+        """
+        while self._segments:
+            segment = self._segments[0]
+            remaining = self._sizes[segment] - self._read_offset
+            if remaining <= 0:
+                self._remove_segment(segment)
+                continue
+            if self._reader is None or self._reader[0] != segment:
+                self._close_reader()
+                self._reader = (segment, open(self._path(segment), 'rb'))
+            reader = self._reader[1]
+            reader.seek(self._read_offset)
+            header = reader.read(_RECORD_HEADER.size)
+            if len(header) == _RECORD_HEADER.size:
+                (length,) = _RECORD_HEADER.unpack(header)
+                if _RECORD_HEADER.size + length <= remaining:
+                    message = reader.read(length)
+                    if len(message) == length:
+                        return (segment, self._read_offset), message
+            self.dropped_bytes += remaining
+            self._read_offset = self._sizes[segment]
+        return None
+
+    def consume(self, position: Tuple[int, int], message: bytes) -> None:
+        """
+        Mark the record returned by peek as replayed. Does nothing if that
+        record has been evicted in the meantime.
+        """
+        segment, offset = position
+        if self._segments and self._segments[0] == segment and \
+                self._read_offset == offset:
+            self._read_offset += _RECORD_HEADER.size + len(message)
+
+    async def replay(self, send: Callable[[bytes], Awaitable[None]]) -> int:
+        """
+        Send every spooled message, oldest first, with send, no faster
+        than replay_rate bytes per second. Stops at the first exception,
+        which is propagated, leaving the failed message in the spool.
+
+        Returns the number of bytes replayed.
+        """
+        start = time.monotonic()
+        replayed = 0
+        while True:
+            record = self.peek()
+            if record is None:
+                return replayed
+            position, message = record
+            await send(message)
+            self.consume(position, message)
+            replayed += len(message)
+            if self.replay_rate:
+                delay = replayed / self.replay_rate - \
+                    (time.monotonic() - start)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+    def close(self) -> None:
+        """
+        Close open segment files. Spooled data stays on disk.
+        """
+        self._close_reader()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def _path(self, segment: int) -> str:
+        return os.path.join(self.directory,
+                            "%020d%s" % (segment, SEGMENT_SUFFIX))
+
+    def _active_writer(self, record_size: int):
+        if self._writer is None or (
+                self._sizes[self._segments[-1]] > 0 and
+                self._sizes[self._segments[-1]] + record_size >
+                self.segment_bytes):
+            if self._writer is not None:
+                self._writer.close()
+            segment = self._segments[-1] + 1 if self._segments else 0
+            self._segments.append(segment)
+            self._sizes[segment] = 0
+            self._writer = open(self._path(segment), 'ab')
+        return self._writer
+
+    def _evict_oldest(self) -> None:
+        segment = self._segments[0]
+        self.dropped_bytes += self._sizes[segment] - self._read_offset
+        self._remove_segment(segment)
+
+    def _remove_segment(self, segment: int) -> None:
+        if self._reader is not None and self._reader[0] == segment:
+            self._close_reader()
+        if self._writer is not None and self._segments[-1] == segment:
+            self._writer.close()
+            self._writer = None
+        self._segments.remove(segment)
+        del self._sizes[segment]
+        self._read_offset = 0
+        os.remove(self._path(segment))
+
+    def _close_reader(self) -> None:
+        if self._reader is not None:
+            self._reader[1].close()
+            self._reader = None
@@ -0,0 +1,155 @@
+import bisect
+from typing import Dict, List, Tuple
+
+
+"""
+    Self-instrumentation of the clients: counters and histograms of what
+    has been encoded and sent.
+"""
+
+# Upper bounds, in seconds, of the buckets of duration histograms.
+TIME_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+# Upper bounds of the buckets of batch size histograms, in points.
+SIZE_BUCKETS = (1, 10, 100, 1000, 10000, 100000, 1000000)
+
+# Percentiles of histograms reported as graphite metrics.
+REPORTED_PERCENTILES = (50, 90, 99)
+
+
+class Histogram:
+    """
+    Histogram counts observed values in fixed buckets, given by their
+    upper bounds, plus a last bucket for values above every bound.
+
+    Observing a value is a bisection and a few additions, cheap enough
+    to be done for every message.
+    """
+
+    __slots__ = ('bounds', 'counts', 'count', 'sum', 'max')
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0
+        self.max = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, pct: float, counts: List[int]=None) -> float:
+        """
+        Upper bound of the bucket holding the pct-th percentile (the
+        largest value observed for the last bucket), or 0 if no value
+        was observed.
+
+        args: pct; counts, bucket counts to use instead of the
+        histogram's own, e.g. the difference of two snapshots.
+        """
+        counts = self.counts if counts is None else counts
+        total = sum(counts)
+        if not total:
+            return 0
+        rank = pct / 100 * total
+        seen = 0
+        for index, count in enumerate(counts):
+            seen += count
+            if count and seen >= rank:
+                break
+        if index < len(self.bounds):
+            return self.bounds[index]
+        return self.max
+
+    def snapshot(self) -> Dict:
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'max': self.max,
+            'buckets': list(self.counts),
+        }
+
+
+class ClientStats:
+    """
+    ClientStats holds the counters and histograms of a client.
+
+    * points_sent, bytes_sent, messages_sent: what has been written to
+      graphite server successfully.
+    * send_errors: messages that failed to be sent.
+    * encode_time: seconds spent encoding each message.
+    * send_time: seconds spent writing and draining each message,
+      retries included.
+    * batch_points: points per message.
+    """
+
+    COUNTERS = ('points_sent', 'bytes_sent', 'messages_sent', 'send_errors')
+    HISTOGRAMS = ('encode_time', 'send_time', 'batch_points')
+
+    def __init__(self):
+        self.points_sent = 0
+        self.bytes_sent = 0
+        self.messages_sent = 0
+        self.send_errors = 0
+        self.encode_time = Histogram(TIME_BUCKETS)
+        self.send_time = Histogram(TIME_BUCKETS)
+        self.batch_points = Histogram(SIZE_BUCKETS)
+        self._reported = {}
+
+    def snapshot(self, **counters) -> Dict:
+        """
+        Current value of every counter and histogram, plus the given
+        counters.
+        """
+        snapshot = {name: getattr(self, name) for name in self.COUNTERS}
+        snapshot.update(counters)
+        for name in self.HISTOGRAMS:
+            snapshot[name] = getattr(self, name).snapshot()
+        return snapshot
+
+    def report(self, prefix: str, **counters) -> List[Tuple[str, float]]:
+        """
+        Graphite points describing the activity since the previous report:
+        <prefix>.<counter> for every counter (the increase since the
+        previous report), and <prefix>.<histogram>.count, .mean and
+        .p<N> for every histogram.
+
+        args: prefix, and extra counters as in snapshot.
+        """
+        snapshot = self.snapshot(**counters)
+        previous, self._reported = self._reported, snapshot
+        dataset = []
+        for name, value in snapshot.items():
+            if name in self.HISTOGRAMS:
+                dataset.extend(self._report_histogram(
+                    prefix + "." + name, getattr(self, name), value,
+                    previous.get(name)))
+            else:
+                dataset.append(
+                    (prefix + "." + name, value - previous.get(name, 0)))
+        return dataset
+
+    def _report_histogram(self, name: str, histogram: Histogram,
+                          current: Dict, previous: Dict) -> List[Tuple]:
+        counts = current['buckets']
+        count, total = current['count'], current['sum']
+        if previous is not None:
+            counts = [now - before for now, before
+                      in zip(counts, previous['buckets'])]
+            count -= previous['count']
+            total -= previous['sum']
+        dataset = [(name + ".count", count)]
+        if count:
+            dataset.append((name + ".mean", total / count))
+            for pct in REPORTED_PERCENTILES:
+                dataset.append((name + ".p%d" % pct,
+                                histogram.percentile(pct, counts)))
+        return dataset
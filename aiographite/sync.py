@@ -0,0 +1,253 @@
+import itertools
+import socket
+import time
+from aiographite.aiographite import (
+    AioGraphiteSendException, DEFAULT_GRAPHITE_PLAINTEXT_PORT,
+    _normalize_data_list
+)
+from aiographite.buffer import MetricBuffer
+from aiographite.graphite_encoder import GraphiteEncoder
+from aiographite.protocol import (
+    PlaintextProtocol, PickleProtocol, _as_list, _check_column_lengths
+)
+from typing import Tuple, List, Iterable
+
+
+# iovec count limit of a single sendmsg call on most platforms
+_MAX_IOVECS = 1024
+
+
+def connect_sync(host, port=DEFAULT_GRAPHITE_PLAINTEXT_PORT,
+                 protocol=PlaintextProtocol(), **kwargs):
+    """
+    A factory for connecting a blocking client to Graphite Server.
+
+    args: host, port, protocol. Any extra keyword arguments are passed on
+    to GraphiteClient.
+
+    Returns a connected GraphiteClient.
+    """
+    client = GraphiteClient(host, port, protocol, **kwargs)
+    client.connect()
+    return client
+
+
+class GraphiteClient:
+    """
+    GraphiteClient is a blocking Graphite client, for code not running an
+    event loop (batch jobs, command line tools, threads). It has the same
+    sending API as AIOGraphite, with plain methods instead of coroutines,
+    and encodes with the same protocols.
+
+    args: graphite_server, graphite_port, protocol, timeout (seconds a
+    write may block), connect_timeout, max_batch_points,
+    max_batch_bytes, flush_interval.
+
+    Buffered mode is enabled by setting any of max_batch_points,
+    max_batch_bytes or flush_interval. Points are then only appended to
+    an in-memory buffer, and sent by the send call filling it up, or by
+    the first send coming flush_interval seconds after the last flush;
+    there is no background flush, so call flush (or close) when done.
+
+    The connection is opened once and kept. If a write fails, the client
+    reconnects and tries again, up to three attempts, then raises
+    AioGraphiteSendException.
+
+    A GraphiteClient is not thread-safe.
+    """
+
+    def __init__(self, graphite_server,
+                 graphite_port=DEFAULT_GRAPHITE_PLAINTEXT_PORT,
+                 protocol=PlaintextProtocol(), timeout=None,
+                 connect_timeout=None, max_batch_points=None,
+                 max_batch_bytes=None, flush_interval=None):
+        if not isinstance(protocol, (PlaintextProtocol, PickleProtocol)):
+            raise AioGraphiteSendException("Unsupported Protocol!")
+        self._graphite_server = graphite_server
+        self._graphite_port = graphite_port
+        self._graphite_server_address = (graphite_server, graphite_port)
+        self.protocol = protocol
+        self._timeout = timeout
+        self._connect_timeout = connect_timeout
+        self._socket = None
+        self._buffer = None
+        if any((max_batch_points, max_batch_bytes, flush_interval)):
+            self._buffer = MetricBuffer(max_batch_points, max_batch_bytes)
+        self._flush_interval = flush_interval
+        self._last_flush = time.monotonic()
+
+    def __enter__(self):
+        self.connect()
+        return self
+
+    def __exit__(self, exc_type, exc_val, tb):
+        self.close()
+
+    def connect(self) -> None:
+        """
+        Connect to Graphite Server based on Provided Server Address
+        """
+        try:
+            sock = socket.create_connection(self._graphite_server_address,
+                                            timeout=self._connect_timeout)
+        except OSError as e:
+            raise AioGraphiteSendException(
+                f"Unable to connect to the provided server address "
+                f"{self._graphite_server_address} due to error : {e}")
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.settimeout(self._timeout)
+        self._socket = sock
+
+    def send(self, metric: str, value: int, timestamp: int=None) -> None:
+        """
+        send a single metric.
+
+        args: metric, value, timestamp. (str, int, int).
+        """
+        if not metric:
+            return
+        timestamp = int(timestamp or time.time())
+        listOfMetricTuples = [(metric, value, timestamp)]
+        if self._buffer is not None:
+            self._enqueue(listOfMetricTuples)
+            return
+        self._send_message(
+            self.protocol.generate_buffers(listOfMetricTuples))
+
+    def send_multiple(self, dataset: List[Tuple],
+                      timestamp: int=None) -> None:
+        """
+        send a list of tuples.
+
+        args: a list of tuples (metric, value, timestamp), and timestamp
+        is optional.
+        """
+        if not dataset:
+            return
+        timestamp = int(timestamp or time.time())
+        listofData = _normalize_data_list(dataset, timestamp)
+        if self._buffer is not None:
+            self._enqueue(listofData)
+            return
+        self._send_message(self.protocol.generate_buffers(listofData))
+
+    def send_columns(self, metrics, values, timestamps=None) -> None:
+        """
+        send parallel columns of metrics and values.
+
+        args: metrics, values, timestamps. See AIOGraphite.send_columns.
+        """
+        if len(metrics) == 0:
+            return
+        if timestamps is None or not hasattr(timestamps, '__len__'):
+            timestamps = int(timestamps or time.time())
+        if self._buffer is not None:
+            _check_column_lengths(metrics, values, timestamps)
+            if hasattr(timestamps, '__len__'):
+                timestamps = _as_list(timestamps)
+            else:
+                timestamps = itertools.repeat(timestamps)
+            self._enqueue(
+                zip(_as_list(metrics), _as_list(values), timestamps))
+            return
+        self._send_message([self.protocol.generate_message_from_columns(
+            metrics, values, timestamps)])
+
+    def send_stream(self, stream: Iterable[Tuple], chunk_size: int=1000,
+                    timestamp: int=None) -> None:
+        """
+        send tuples pulled lazily from an iterable, chunk_size at a time.
+
+        args: an iterable of tuples (metric, value, timestamp),
+        chunk_size, and timestamp is optional.
+        """
+        timestamp = int(timestamp or time.time())
+        iterator = iter(stream)
+        while True:
+            chunk = list(itertools.islice(iterator, chunk_size))
+            if not chunk:
+                return
+            self.send_multiple(chunk, timestamp)
+
+    def flush(self) -> None:
+        """
+        Send every buffered point to graphite server right away.
+        """
+        self._last_flush = time.monotonic()
+        if not self._buffer:
+            return
+        self._send_message(self.protocol.generate_buffers(
+            self._buffer.drain()))
+
+    def close(self) -> None:
+        """
+        Flush any buffered points, then close the connection to graphite
+        server.
+        """
+        try:
+            self.flush()
+        finally:
+            self._disconnect()
+
+    def clean_and_join_metric_parts(self, metric_parts: List[str]) -> str:
+        """
+        See AIOGraphite.clean_and_join_metric_parts.
+        """
+        return GraphiteEncoder.join_metric_parts(metric_parts)
+
+    def _disconnect(self) -> None:
+        if self._socket is not None:
+            try:
+                self._socket.close()
+            finally:
+                self._socket = None
+
+    def _enqueue(self, points: Iterable[Tuple[str, int, int]]) -> None:
+        """
+            add points to the buffer, flushing it whenever it is full or
+            flush_interval has elapsed.
+        """
+        buffer = self._buffer
+        for point in points:
+            buffer.add(*point)
+            if buffer.is_full():
+                self.flush()
+        if self._flush_interval is not None and \
+                time.monotonic() - self._last_flush >= self._flush_interval:
+            self.flush()
+
+    def _send_message(self, message: List) -> None:
+        """
+            @message: a list of buffers, written with a single vectored
+            write where available.
+        """
+        error = None
+        for _ in range(3):
+            try:
+                if self._socket is None:
+                    self.connect()
+                self._write(message)
+                return
+            except (OSError, AioGraphiteSendException) as e:
+                # If failed to send data, then try again on a new
+                # connection
+                error = e
+                self._disconnect()
+        raise AioGraphiteSendException(
+            f"Failed to send metrics after reaching max retries: {error}")
+
+    def _write(self, buffers: List) -> None:
+        if len(buffers) == 1 or not hasattr(self._socket, 'sendmsg'):
+            self._socket.sendall(b"".join(buffers))
+            return
+        views = [memoryview(buffer) for buffer in buffers if len(buffer)]
+        first = 0
+        while first < len(views):
+            sent = self._socket.sendmsg(views[first:first + _MAX_IOVECS])
+            # skip the buffers written entirely, and the written part of
+            # the next one
+            while sent and sent >= len(views[first]):
+                sent -= len(views[first])
+                first += 1
+            if sent:
+                views[first] = views[first][sent:]
@@ -0,0 +1,329 @@
+import argparse
+import asyncio
+import io
+import pickle
+import socket
+import struct
+import time
+from aiographite.protocol import PlaintextProtocol, PickleProtocol, _number
+from typing import List, Tuple
+
+
+"""
+    A fake carbon server, to test and load test clients on one machine
+    without running carbon.
+"""
+
+# pickle frame header: payload length, as carbon's pickle receiver reads it
+_FRAME_HEADER = struct.Struct('!L')
+
+
+class _SafeUnpickler(pickle.Unpickler):
+    """
+    Unpickler refusing every global, like carbon's: points are made of
+    lists, tuples, strings and numbers only.
+    """
+
+    def find_class(self, module, name):
+        raise pickle.UnpicklingError(f"global {module}.{name} is forbidden")
+
+
+class _PlaintextDecoder:
+    """
+    Decodes plaintext lines, or only counts them if keep_points is False.
+    """
+
+    def __init__(self, keep_points: bool):
+        self.keep_points = keep_points
+        self._partial = b''
+
+    def feed(self, data: bytes) -> Tuple[int, List[Tuple], int]:
+        """
+        returns the number of complete lines received so far, their
+        points, and the number of malformed lines.
+        """
+        if not self.keep_points:
+            return data.count(b'\n'), [], 0
+        lines = (self._partial + data).split(b'\n')
+        self._partial = lines.pop()
+        points, malformed = [], 0
+        for line in lines:
+            try:
+                metric, value, timestamp = line.split()
+                points.append((metric.decode('utf-8'), _number(value),
+                               int(timestamp)))
+            except ValueError:
+                malformed += 1
+        return len(points), points, malformed
+
+
+class _PickleDecoder:
+    """
+    Unpickles frames, keeping their points if keep_points is True.
+    """
+
+    def __init__(self, keep_points: bool):
+        self.keep_points = keep_points
+        self._buffer = bytearray()
+
+    def feed(self, data: bytes) -> Tuple[int, List[Tuple], int]:
+        """
+        returns the number of points of the complete frames received so
+        far, their points, and the number of frames that could not be
+        unpickled.
+        """
+        buffer = self._buffer
+        buffer += data
+        count, points, malformed, offset = 0, [], 0, 0
+        while len(buffer) - offset >= _FRAME_HEADER.size:
+            length, = _FRAME_HEADER.unpack_from(buffer, offset)
+            end = offset + _FRAME_HEADER.size + length
+            if len(buffer) < end:
+                break
+            payload = bytes(buffer[offset + _FRAME_HEADER.size:end])
+            offset = end
+            try:
+                frame = _SafeUnpickler(io.BytesIO(payload)).load()
+                if self.keep_points:
+                    for metric, (timestamp, value) in frame:
+                        points.append((metric, value, timestamp))
+                count += len(frame)
+            except Exception:
+                malformed += 1
+        del buffer[:offset]
+        return count, points, malformed
+
+
+class FakeCarbon:
+    """
+    FakeCarbon is an asyncio server accepting metrics like carbon does,
+    decoding and counting the points it receives.
+
+    args: host, port (0 picks a free port, see port once started),
+    protocol, PlaintextProtocol or PickleProtocol, the framing to
+    decode; keep_points, whether to decode and keep every point received
+    in points (metric, value, timestamp), or only count them, which is
+    faster but does not detect malformed plaintext lines.
+
+    Faults can be injected to test reconnects, batching and backpressure:
+
+    * latency: seconds a new connection waits before being read from.
+    * read_size and read_delay: read at most read_size bytes at a time,
+      sleeping read_delay seconds after every read: a slow carbon, whose
+      socket buffers fill up and make the client's drain wait.
+    * reset_after: abort every connection with a TCP reset once it
+      received that many points.
+    * pause() and resume(): stop and restart reading from every
+      connection, i.e. full backpressure. reset() aborts every open
+      connection.
+
+    Counters: points_received, bytes_received, connections, resets,
+    malformed (lines or frames that could not be decoded).
+    points_per_second() gives the rate points have been received at.
+
+    example:
+
+    .. code:: python
+
+        async with FakeCarbon(protocol=PickleProtocol()) as carbon:
+            graphite = await connect('127.0.0.1', carbon.port,
+                                     PickleProtocol())
+            await graphite.send_multiple(dataset)
+            await carbon.wait_for_points(len(dataset))
+    """
+
+    def __init__(self, host: str='127.0.0.1', port: int=0,
+                 protocol=PlaintextProtocol(), keep_points: bool=True,
+                 latency: float=0, read_size: int=65536,
+                 read_delay: float=0, reset_after: int=None):
+        if not isinstance(protocol, (PlaintextProtocol, PickleProtocol)):
+            raise ValueError("Unsupported Protocol!")
+        self.host = host
+        self.port = port
+        self.protocol = protocol
+        self.keep_points = keep_points
+        self.latency = latency
+        self.read_size = read_size
+        self.read_delay = read_delay
+        self.reset_after = reset_after
+        self.points = []
+        self.points_received = 0
+        self.bytes_received = 0
+        self.connections = 0
+        self.resets = 0
+        self.malformed = 0
+        self._first_connection = None
+        self._last_point = None
+        self._server = None
+        # handler task of every open connection, by writer
+        self._connections = {}
+        self._reading = None
+        self._received = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, tb):
+        await self.stop()
+
+    async def start(self) -> None:
+        """
+        Start listening, on a free port if port is 0.
+        """
+        self._reading = asyncio.Event()
+        self._reading.set()
+        self._received = asyncio.Event()
+        self._server = await asyncio.start_server(
+            self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        """
+        Stop listening, and close every connection.
+        """
+        if self._server is None:
+            return
+        self._server.close()
+        self._reading.set()
+        for writer in list(self._connections):
+            writer.close()
+        await asyncio.gather(*self._connections.values(),
+                             return_exceptions=True)
+        await self._server.wait_closed()
+        self._server = None
+
+    def pause(self) -> None:
+        """
+        Stop reading from every connection, until resume is called.
+        """
+        self._reading.clear()
+
+    def resume(self) -> None:
+        self._reading.set()
+
+    def reset(self) -> None:
+        """
+        Abort every open connection with a TCP reset.
+        """
+        for writer in list(self._connections):
+            self._abort(writer)
+
+    def points_per_second(self) -> float:
+        """
+        Points received per second, from the first connection to the last
+        point received.
+        """
+        if self._last_point is None:
+            return 0.0
+        elapsed = self._last_point - self._first_connection
+        return self.points_received / elapsed if elapsed else 0.0
+
+    async def wait_for_points(self, count: int, timeout: float=None) -> None:
+        """
+        Wait until at least count points have been received in total.
+        """
+        async def wait():
+            while self.points_received < count:
+                self._received.clear()
+                await self._received.wait()
+
+        await asyncio.wait_for(wait(), timeout)
+
+    async def _handle(self, reader, writer) -> None:
+        self.connections += 1
+        if self._first_connection is None:
+            self._first_connection = time.perf_counter()
+        self._connections[writer] = asyncio.current_task()
+        if isinstance(self.protocol, PickleProtocol):
+            decoder = _PickleDecoder(self.keep_points)
+        else:
+            decoder = _PlaintextDecoder(self.keep_points)
+        points_on_connection = 0
+        try:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            while True:
+                await self._reading.wait()
+                data = await reader.read(self.read_size)
+                if not data:
+                    break
+                self.bytes_received += len(data)
+                count, points, malformed = decoder.feed(data)
+                self.malformed += malformed
+                if count:
+                    self._count(count, points)
+                    points_on_connection += count
+                if self.reset_after is not None and \
+                        points_on_connection >= self.reset_after:
+                    self._abort(writer)
+                    break
+                if self.read_delay:
+                    await asyncio.sleep(self.read_delay)
+        except ConnectionError:
+            pass
+        finally:
+            self._connections.pop(writer, None)
+            writer.close()
+
+    def _count(self, count: int, points: List[Tuple]) -> None:
+        self._last_point = time.perf_counter()
+        self.points_received += count
+        self.points.extend(points)
+        self._received.set()
+
+    def _abort(self, writer) -> None:
+        sock = writer.get_extra_info('socket')
+        if sock is not None:
+            # a zero linger time makes close send a reset
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER,
+                            struct.pack('ii', 1, 0))
+        writer.transport.abort()
+        self.resets += 1
+
+
+async def _serve(carbon: FakeCarbon, interval: float) -> None:
+    async with carbon:
+        print(f"fake carbon listening on {carbon.host}:{carbon.port}")
+        received = 0
+        while True:
+            await asyncio.sleep(interval)
+            rate = (carbon.points_received - received) / interval
+            received = carbon.points_received
+            print(f"{rate:,.0f} points/sec, {received:,} points, "
+                  f"{carbon.connections} connections, "
+                  f"{carbon.malformed} malformed")
+
+
+def main(argv=None) -> None:
+    """
+    Run a fake carbon server printing the points/sec it receives:
+
+        python -m aiographite.testing --port 2003 --protocol pickle
+    """
+    parser = argparse.ArgumentParser(description="Run a fake carbon server.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=2003)
+    parser.add_argument('--protocol', choices=('plaintext', 'pickle'),
+                        default='plaintext')
+    parser.add_argument('--latency', type=float, default=0)
+    parser.add_argument('--read-size', type=int, default=65536)
+    parser.add_argument('--read-delay', type=float, default=0)
+    parser.add_argument('--reset-after', type=int)
+    parser.add_argument('--interval', type=float, default=1.0,
+                        help="seconds between reports")
+    args = parser.parse_args(argv)
+    protocol = PickleProtocol() if args.protocol == 'pickle' \
+        else PlaintextProtocol()
+    carbon = FakeCarbon(args.host, args.port, protocol, keep_points=False,
+                        latency=args.latency, read_size=args.read_size,
+                        read_delay=args.read_delay,
+                        reset_after=args.reset_after)
+    try:
+        asyncio.run(_serve(carbon, args.interval))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
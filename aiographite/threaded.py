@@ -0,0 +1,258 @@
+import asyncio
+import concurrent.futures
+import logging
+import threading
+import time
+from collections import deque
+from aiographite.aiographite import (
+    AIOGraphite, AioGraphiteSendException, DEFAULT_GRAPHITE_PLAINTEXT_PORT
+)
+from aiographite.protocol import PlaintextProtocol
+from typing import Tuple, List
+
+
+logger = logging.getLogger(__name__)
+
+
+class ThreadedAIOGraphite:
+    """
+    ThreadedAIOGraphite runs an AIOGraphite client on a dedicated thread
+    with its own event loop, so that encoding and socket I/O never
+    compete with the caller's event loop.
+
+    args: graphite_server, graphite_port, protocol; max_pending, the
+    maximum number of batches waiting for the sender thread (None for no
+    limit), batches sent once it is reached being dropped and counted in
+    dropped_batches. Any extra keyword arguments are passed on to
+    AIOGraphite.
+
+    Batches are handed over to the sender thread through a deque, and
+    the sender thread is only woken up when it is idle. Every wake-up
+    sends all the pending batches at once.
+
+    * send_nowait and send_multiple_nowait can be called from any thread.
+      They never block and never raise on send failures, which are
+      logged.
+    * send, send_multiple and flush are coroutines which can be awaited
+      from any event loop. They return once the points have been sent,
+      and raise AioGraphiteSendException if that failed.
+
+    example:
+
+    .. code:: python
+
+        with ThreadedAIOGraphite(host, port) as graphite:
+            graphite.send_nowait('jobs.done', 1)
+    """
+
+    def __init__(self, graphite_server,
+                 graphite_port=DEFAULT_GRAPHITE_PLAINTEXT_PORT,
+                 protocol=PlaintextProtocol(), max_pending: int=None,
+                 **kwargs):
+        self.client = AIOGraphite(graphite_server, graphite_port, protocol,
+                                  **kwargs)
+        self.max_pending = max_pending
+        self.dropped_batches = 0
+        self._pending = deque()
+        self._wakeup_scheduled = False
+        self._closing = False
+        self._loop = None
+        self._thread = None
+        self._wakeup = None
+        self._sender_task = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, tb):
+        self.stop()
+
+    async def __aenter__(self):
+        await asyncio.get_running_loop().run_in_executor(None, self.start)
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, tb):
+        await self.close()
+
+    def start(self) -> None:
+        """
+        Start the sender thread, and connect to graphite server from it.
+        """
+        if self._thread is not None:
+            return
+        self._closing = False
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever,
+                                        name='aiographite-sender',
+                                        daemon=True)
+        self._thread.start()
+        try:
+            self._call(self._setup()).result()
+        except BaseException:
+            self._stop_thread()
+            raise
+
+    def stop(self, timeout: float=None) -> None:
+        """
+        Send the pending batches, close the connection and stop the sender
+        thread, waiting at most timeout seconds for the pending batches.
+        """
+        if self._thread is None:
+            return
+        try:
+            self._call(self._shutdown()).result(timeout)
+        finally:
+            self._stop_thread()
+
+    async def close(self) -> None:
+        """
+        Same as stop, awaitable from an event loop.
+        """
+        await asyncio.get_running_loop().run_in_executor(None, self.stop)
+
+    def send_nowait(self, metric: str, value: int,
+                    timestamp: int=None) -> None:
+        """
+        Queue a single metric for the sender thread. Thread-safe.
+
+        args: metric, value, timestamp. (str, int, int).
+        """
+        if not metric:
+            return
+        self._put([(metric, value, int(timestamp or time.time()))], None)
+
+    def send_multiple_nowait(self, dataset: List[Tuple],
+                             timestamp: int=None) -> None:
+        """
+        Queue a list of tuples for the sender thread. Thread-safe.
+
+        args: a list of tuples (metric, value, timestamp), and timestamp
+        is optional.
+        """
+        if not dataset:
+            return
+        self._put(dataset, int(timestamp or time.time()))
+
+    async def send(self, metric: str, value: int, timestamp: int=None) -> None:
+        """
+        send a single metric through the sender thread, and wait for it to
+        be sent.
+
+        args: metric, value, timestamp. (str, int, int).
+        """
+        if not metric:
+            return
+        future = self._put([(metric, value, int(timestamp or time.time()))],
+                           None, concurrent.futures.Future())
+        await asyncio.wrap_future(future)
+
+    async def send_multiple(self, dataset: List[Tuple],
+                            timestamp: int=None) -> None:
+        """
+        send a list of tuples through the sender thread, and wait for them
+        to be sent.
+
+        args: a list of tuples (metric, value, timestamp), and timestamp
+        is optional.
+        """
+        if not dataset:
+            return
+        future = self._put(dataset, int(timestamp or time.time()),
+                           concurrent.futures.Future())
+        await asyncio.wrap_future(future)
+
+    async def flush(self) -> None:
+        """
+        Send the pending batches, and the points buffered by the client.
+        """
+        await asyncio.wrap_future(self._call(self._flush()))
+
+    def _call(self, coroutine) -> concurrent.futures.Future:
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+
+    def _stop_thread(self) -> None:
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._loop, self._thread = None, None
+
+    def _put(self, dataset: List[Tuple], timestamp: int,
+             future: concurrent.futures.Future=None):
+        """
+            hand a batch over to the sender thread, waking it up unless a
+            wake-up is already scheduled.
+        """
+        if self._loop is None or self._closing:
+            raise AioGraphiteSendException(
+                "The sender thread is not running!")
+        if self.max_pending is not None and \
+                len(self._pending) >= self.max_pending:
+            self.dropped_batches += 1
+            if future is not None:
+                future.set_exception(AioGraphiteSendException(
+                    "Too many batches pending, dropped the batch!"))
+            return future
+        self._pending.append((dataset, timestamp, future))
+        if not self._wakeup_scheduled:
+            self._wakeup_scheduled = True
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+        return future
+
+    async def _setup(self) -> None:
+        self._wakeup = asyncio.Event()
+        self._sender_task = asyncio.ensure_future(self._send_forever())
+        await self.client._connect()
+
+    async def _shutdown(self) -> None:
+        self._closing = True
+        self._wakeup.set()
+        await self._sender_task
+        # batches handed over while the sender task was stopping
+        await self._send_pending()
+        await self.client.close()
+
+    async def _flush(self) -> None:
+        await self._send_pending()
+        await self.client.flush()
+
+    async def _send_forever(self) -> None:
+        """
+            sender thread task sending pending batches whenever woken up,
+            until the client is stopped.
+        """
+        while not self._closing:
+            await self._wakeup.wait()
+            await self._send_pending()
+
+    async def _send_pending(self) -> None:
+        """
+            send every pending batch at once, and report the outcome to
+            the callers waiting for it.
+        """
+        # reset before taking batches: a batch added from now on
+        # schedules a new wake-up
+        self._wakeup.clear()
+        self._wakeup_scheduled = False
+        pending = self._pending
+        normalize = self.client._normalize_data_list
+        dataset, futures = [], []
+        while pending:
+            batch, timestamp, future = pending.popleft()
+            if timestamp is not None:
+                batch = normalize(batch, timestamp)
+            dataset.extend(batch)
+            # the batch is sent even if its caller stopped waiting
+            if future is not None and future.set_running_or_notify_cancel():
+                futures.append(future)
+        if not dataset:
+            return
+        try:
+            await self.client.send_multiple(dataset)
+        except Exception as e:
+            logger.warning("Dropped metrics: %s", e)
+            for future in futures:
+                future.set_exception(e)
+        else:
+            for future in futures:
+                future.set_result(None)
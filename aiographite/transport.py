@@ -0,0 +1,357 @@
+import asyncio
+import socket
+from aiographite.exceptions import AioGraphiteSendException
+from typing import Union, List, Iterator
+
+
+# Largest UDP payload fitting in a single 1500 bytes ethernet frame:
+# 1500 - 20 (IPv4 header) - 8 (UDP header).
+DEFAULT_MAX_DATAGRAM_SIZE = 1472
+
+
+class Transport:
+    """
+    Transport is the interface AIOGraphite uses to ship encoded messages,
+    independently of the protocol that encoded them.
+
+    A message is either bytes or a list of buffers to be written one
+    after another.
+    """
+
+    # whether the transport can only carry the plaintext protocol
+    plaintext_only = False
+
+    # the client's aiographite.hooks.ClientHooks, called on retries
+    hooks = None
+
+    @property
+    def is_connected(self) -> bool:
+        raise NotImplementedError
+
+    async def connect(self) -> None:
+        raise NotImplementedError
+
+    async def send(self, message: Union[bytes, List]) -> None:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        raise NotImplementedError
+
+
+class StreamTransport(Transport):
+    """
+    StreamTransport sends messages over an asyncio stream. If a write
+    fails, it reconnects and tries again, up to three attempts.
+
+    args: timeout, the maximum number of seconds to wait for a write to
+    be drained; connect_timeout, the maximum number of seconds to wait
+    for the connection to be established; idle_timeout, the number of
+    seconds after which an unused connection is reopened before writing,
+    rather than trusted (a load balancer or firewall may have dropped it
+    silently). None disables a timeout.
+
+    Before every write, the connection is also checked for having been
+    closed by the server, in which case it is reopened first instead of
+    losing the write.
+
+    Failed writes are counted in retries, and connections opened after
+    the first one in reconnects.
+    """
+
+    def __init__(self, timeout: float=None, connect_timeout: float=None,
+                 idle_timeout: float=None):
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.idle_timeout = idle_timeout
+        self._reader, self._writer = None, None
+        self._last_used = 0.0
+        self._connected_before = False
+        self.reconnects = 0
+        self.retries = 0
+
+    @property
+    def address(self):
+        raise NotImplementedError
+
+    async def _open_connection(self):
+        raise NotImplementedError
+
+    def _configure_socket(self, sock: socket.socket) -> None:
+        """
+            set socket options once connected.
+        """
+
+    @property
+    def is_connected(self) -> bool:
+        return self._writer is not None
+
+    def is_alive(self) -> bool:
+        """
+        Whether the connection is open, and can be written to without
+        reconnecting first. Carbon never writes back, so end of file on
+        the reader means the server closed the connection.
+        """
+        if self._writer is None or self._writer.is_closing() or \
+                self._reader.at_eof():
+            return False
+        if self.idle_timeout is None:
+            return True
+        loop = asyncio.get_running_loop()
+        return loop.time() - self._last_used < self.idle_timeout
+
+    async def connect(self) -> None:
+        """
+        Connect to Graphite Server based on Provided Server Address
+        """
+        try:
+            self._reader, self._writer = await asyncio.wait_for(
+                self._open_connection(), timeout=self.connect_timeout)
+        except asyncio.TimeoutError:
+            raise AioGraphiteSendException(
+                f"Unable to connect to the provided server address "
+                f"{self.address} within {self.connect_timeout} seconds")
+        except Exception as e:
+            raise AioGraphiteSendException(
+                f"Unable to connect to the provided server address "
+                f"{self.address} due to error : {e}")
+        sock = self._writer.get_extra_info('socket')
+        if sock is not None:
+            self._configure_socket(sock)
+        self._last_used = asyncio.get_running_loop().time()
+        if self._connected_before:
+            self.reconnects += 1
+        self._connected_before = True
+
+    async def send(self, message: Union[bytes, List]) -> None:
+        """
+            @message: data ready to sent to graphite server, either
+            bytes or a list of buffers written with a single vectored
+            write (writelines).
+        """
+        if self._writer is not None and not self.is_alive():
+            await self.close()
+        if not self._writer:
+            await self.connect()
+        attempts = 3
+        while attempts > 0:
+            try:
+                if isinstance(message, list):
+                    self._writer.writelines(message)
+                else:
+                    self._writer.write(message)
+                await asyncio.wait_for(
+                    self._writer.drain(),
+                    timeout=self.timeout
+                    )
+                self._last_used = asyncio.get_running_loop().time()
+                return
+            except Exception as e:
+                # If failed to send data, then try to set up a
+                # new connection
+                self.retries += 1
+                if self.hooks is not None:
+                    self.hooks.on_retry(4 - attempts, e)
+                try:
+                    await self.close()
+                    await self.connect()
+                except Exception:
+                    # if all attempts failed, then raise exception
+                    if attempts == 1:
+                        raise AioGraphiteSendException(
+                                "Failed to send metrics after"
+                                "reaching max retries!"
+                            )
+                    else:
+                        pass
+                attempts = attempts - 1
+
+    async def close(self) -> None:
+        """
+        Close the connection to graphite server.
+        """
+        try:
+            if self._writer:
+                self._writer.close()
+        finally:
+            self._writer = None
+            self._reader = None
+
+
+class TCPTransport(StreamTransport):
+    """
+    TCPTransport sends messages over a TCP connection. This is the
+    default transport of AIOGraphite.
+
+    args: host, port, timeout, connect_timeout, idle_timeout; nodelay,
+    whether to disable Nagle's algorithm (TCP_NODELAY), so that small
+    messages are not delayed; keepalive, the number of idle seconds
+    after which TCP keepalive probes detect a dead peer, or None to
+    leave keepalive off.
+    """
+
+    def __init__(self, host: str, port: int, timeout: float=None,
+                 connect_timeout: float=None, idle_timeout: float=None,
+                 nodelay: bool=True, keepalive: float=None):
+        super().__init__(timeout, connect_timeout, idle_timeout)
+        self.host = host
+        self.port = port
+        self.nodelay = nodelay
+        self.keepalive = keepalive
+
+    @property
+    def address(self):
+        return (self.host, self.port)
+
+    async def _open_connection(self):
+        return await asyncio.open_connection(self.host, self.port)
+
+    def _configure_socket(self, sock: socket.socket) -> None:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY,
+                        int(self.nodelay))
+        if self.keepalive is None:
+            return
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        interval = max(1, int(self.keepalive))
+        # not every platform allows tuning keepalive probes
+        for option in ('TCP_KEEPIDLE', 'TCP_KEEPINTVL'):
+            if hasattr(socket, option):
+                sock.setsockopt(socket.IPPROTO_TCP,
+                                getattr(socket, option), interval)
+
+
+class UnixTransport(StreamTransport):
+    """
+    UnixTransport sends messages over a Unix domain socket, e.g. to a
+    carbon-relay or a sidecar listening on the same host, which is
+    cheaper than a loopback TCP connection.
+
+    args: path, port, timeout, connect_timeout, idle_timeout. port is
+    ignored, so that the class can be passed as AIOGraphite's transport
+    argument along with the socket path as graphite_server.
+    """
+
+    def __init__(self, path: str, port: int=None, timeout: float=None,
+                 connect_timeout: float=None, idle_timeout: float=None):
+        super().__init__(timeout, connect_timeout, idle_timeout)
+        self.path = path
+
+    @property
+    def address(self):
+        return self.path
+
+    async def _open_connection(self):
+        return await asyncio.open_unix_connection(self.path)
+
+
+class MemoryTransport(Transport):
+    """
+    MemoryTransport keeps messages in memory instead of sending them,
+    which is handy to test or benchmark encoding and client overhead
+    without a network round-trip.
+
+    args: host, port, keep_data. host and port are ignored. With
+    keep_data=False, only messages_sent and bytes_sent are counted.
+    """
+
+    def __init__(self, host: str=None, port: int=None,
+                 keep_data: bool=True):
+        self.keep_data = keep_data
+        self.data = bytearray()
+        self.messages_sent = 0
+        self.bytes_sent = 0
+        self._connected = False
+
+    @property
+    def is_connected(self) -> bool:
+        return self._connected
+
+    async def connect(self) -> None:
+        self._connected = True
+
+    async def send(self, message: Union[bytes, List]) -> None:
+        if not isinstance(message, list):
+            message = [message]
+        self.messages_sent += 1
+        for buffer in message:
+            self.bytes_sent += len(buffer)
+            if self.keep_data:
+                self.data += buffer
+
+    async def close(self) -> None:
+        self._connected = False
+
+
+class UDPTransport(Transport):
+    """
+    UDPTransport sends plaintext metrics to carbon's UDP listener
+    (ENABLE_UDP_LISTENER), fire-and-forget: sending never waits for the
+    network, and never retries or reconnects. Datagrams lost on the way
+    are lost for good.
+
+    args: host, port, max_datagram_size. Messages are split on line
+    boundaries into datagrams of at most max_datagram_size bytes, since
+    carbon parses each datagram on its own. A single line longer than
+    that is sent in its own datagram.
+    """
+
+    # carbon only accepts the plaintext protocol over UDP
+    plaintext_only = True
+
+    def __init__(self, host: str, port: int,
+                 max_datagram_size: int=DEFAULT_MAX_DATAGRAM_SIZE):
+        self.host = host
+        self.port = port
+        self.max_datagram_size = max_datagram_size
+        self._transport = None
+
+    @property
+    def is_connected(self) -> bool:
+        return self._transport is not None
+
+    async def connect(self) -> None:
+        """
+        Create the datagram endpoint. No packet is sent.
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            self._transport, _ = await loop.create_datagram_endpoint(
+                asyncio.DatagramProtocol,
+                remote_addr=(self.host, self.port))
+        except Exception as e:
+            raise AioGraphiteSendException(
+                f"Unable to create UDP endpoint for "
+                f"{(self.host, self.port)} due to error : {e}")
+
+    async def send(self, message: Union[bytes, List]) -> None:
+        """
+        Send a plaintext message, as bytes or a list of buffers.
+        """
+        if self._transport is None:
+            await self.connect()
+        if isinstance(message, list):
+            message = b"".join(message)
+        for datagram in self._datagrams(message):
+            self._transport.sendto(datagram)
+
+    async def close(self) -> None:
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+
+    def _datagrams(self, message: bytes) -> Iterator[memoryview]:
+        """
+            split a message on line boundaries into datagrams no larger
+            than max_datagram_size, without copying it.
+        """
+        view = memoryview(message)
+        limit = self.max_datagram_size
+        start, length = 0, len(message)
+        while length - start > limit:
+            end = message.rfind(b"\n", start, start + limit) + 1
+            if end <= start:
+                # a single line longer than a datagram
+                end = message.find(b"\n", start + limit) + 1 or length
+            yield view[start:end]
+            start = end
+        if start < length:
+            yield view[start:]
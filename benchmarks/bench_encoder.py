@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+"""
+    Throughput of GraphiteEncoder.encode for ASCII parts, which take the
+    fast path, and for unicode parts and parts with special characters,
+    which are punycoded and URL quoted.
+
+    cached: parts drawn from a small set, as metric names usually are,
+    with the default cache warm. uncached: the cache disabled.
+
+    usage: python benchmarks/bench_encoder.py [distinct_parts]
+
+    results() is used by benchmarks/run.py to track regressions.
+"""
+import sys
+from aiographite.graphite_encoder import GraphiteEncoder, DEFAULT_CACHE_SIZE
+from bench_protocol import bench
+
+
+PART_KINDS = {
+    'ascii': "host%d",
+    'unicode': "主机%d",
+    'special': "velo@zillow.com %d",
+}
+
+
+def make_parts(kind, count):
+    return [PART_KINDS[kind] % i for i in range(count)]
+
+
+def encode_all(parts):
+    encode = GraphiteEncoder.encode
+    for part in parts:
+        encode(part)
+
+
+def bench_encode(parts, cache_size):
+    GraphiteEncoder.configure_cache(cache_size)
+    try:
+        encode_all(parts)
+        return bench(lambda: encode_all(parts), len(parts))
+    finally:
+        GraphiteEncoder.configure_cache()
+
+
+def results(count=1000):
+    """
+    parts/sec of GraphiteEncoder.encode for every kind of part, with and
+    without the cache.
+    """
+    results = {}
+    for kind in PART_KINDS:
+        parts = make_parts(kind, count)
+        results[f"encoder.{kind}.cached"] = bench_encode(
+            parts, DEFAULT_CACHE_SIZE)
+        results[f"encoder.{kind}.uncached"] = bench_encode(parts, 0)
+    return results
+
+
+def main(count):
+    print(f"{'part':>9} {'cached':>14} {'uncached':>14}   (parts/sec)")
+    current = results(count)
+    for kind in PART_KINDS:
+        print(f"{kind:>9} {current[f'encoder.{kind}.cached']:>14,.0f} "
+              f"{current[f'encoder.{kind}.uncached']:>14,.0f}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+"""
+    Encoding throughput of the plaintext and pickle protocols.
+
+    plaintext: compares the previous per-tuple encoder (_format_data for
+    every point) with PlaintextProtocol.generate_message and
+    PlaintextProtocol.generate_message_from_columns.
+
+    pickle: compares PickleProtocol() with PickleProtocol(memo=False).
+
+    usage: python benchmarks/bench_protocol.py [batch_size ...]
+
+    results() is used by benchmarks/run.py to track regressions.
+"""
+import sys
+import timeit
+from aiographite.protocol import PlaintextProtocol, PickleProtocol
+
+
+TIMESTAMP = 1471640923
+
+
+def make_dataset(size):
+    return [
+        ("servers.host%d.cpu.user" % (i % 100), i * 1.5 if i % 2 else i,
+         TIMESTAMP + i)
+        for i in range(size)
+    ]
+
+
+def per_tuple_message(protocol, dataset):
+    listOfPlaintext = []
+    for metric, value, timestamp in dataset:
+        listOfPlaintext.append(protocol._format_data(metric, value, timestamp))
+    return "".join(listOfPlaintext).encode('ascii')
+
+
+def bench(func, size, repeat=5):
+    number = max(1, 100000 // size)
+    best = min(timeit.repeat(func, number=number, repeat=repeat)) / number
+    return size / best
+
+
+def bench_plaintext(sizes):
+    protocol = PlaintextProtocol()
+    print(f"{'plaintext':>9} {'per-tuple':>14} {'generate_message':>18} "
+          f"{'columns':>14}   (points/sec)")
+    for size in sizes:
+        dataset = make_dataset(size)
+        metrics = [metric for metric, _, _ in dataset]
+        values = [value for _, value, _ in dataset]
+        timestamps = [timestamp for _, _, timestamp in dataset]
+        assert per_tuple_message(protocol, dataset) == \
+            protocol.generate_message(dataset) == \
+            protocol.generate_message_from_columns(metrics, values, timestamps)
+        legacy = bench(lambda: per_tuple_message(protocol, dataset), size)
+        current = bench(lambda: protocol.generate_message(dataset), size)
+        columns = bench(lambda: protocol.generate_message_from_columns(
+            metrics, values, timestamps), size)
+        print(f"{size:>9} {legacy:>14,.0f} {current:>18,.0f} "
+              f"{columns:>14,.0f}")
+
+
+def bench_pickle(sizes):
+    memo, no_memo = PickleProtocol(), PickleProtocol(memo=False)
+    print(f"{'pickle':>9} {'memo':>14} {'memo=False':>18} "
+          f"{'size ratio':>14}   (points/sec)")
+    for size in sizes:
+        dataset = make_dataset(size)
+        ratio = len(no_memo.generate_message(dataset)) / \
+            len(memo.generate_message(dataset))
+        legacy = bench(lambda: memo.generate_message(dataset), size)
+        current = bench(lambda: no_memo.generate_message(dataset), size)
+        print(f"{size:>9} {legacy:>14,.0f} {current:>18,.0f} "
+              f"{ratio:>14.2f}")
+
+
+def results(sizes):
+    """
+    points/sec of the current encoders for every protocol and batch size.
+    """
+    plaintext, pickle = PlaintextProtocol(), PickleProtocol()
+    results = {}
+    for size in sizes:
+        dataset = make_dataset(size)
+        metrics = [metric for metric, _, _ in dataset]
+        values = [value for _, value, _ in dataset]
+        timestamps = [timestamp for _, _, timestamp in dataset]
+        results[f"protocol.plaintext.{size}"] = bench(
+            lambda: plaintext.generate_message(dataset), size)
+        results[f"protocol.plaintext_columns.{size}"] = bench(
+            lambda: plaintext.generate_message_from_columns(
+                metrics, values, timestamps), size)
+        results[f"protocol.pickle.{size}"] = bench(
+            lambda: pickle.generate_message(dataset), size)
+    return results
+
+
+def main(sizes):
+    bench_plaintext(sizes)
+    print()
+    bench_pickle(sizes)
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [100, 10000, 100000])
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+"""
+    End-to-end throughput of AIOGraphite against a local FakeCarbon
+    (aiographite.testing), counting points without keeping them:
+    points/sec from the first send until the server received the last
+    point, for each protocol, with send_multiple batches and in buffered
+    mode (send of single points, batched by the client).
+
+    usage: python benchmarks/bench_send.py [points]
+
+    results() is used by benchmarks/run.py to track regressions.
+"""
+import asyncio
+import sys
+import time
+from aiographite import AIOGraphite
+from aiographite.protocol import PlaintextProtocol, PickleProtocol
+from aiographite.testing import FakeCarbon
+
+
+PROTOCOLS = {
+    'plaintext': PlaintextProtocol,
+    'pickle': PickleProtocol,
+}
+
+BATCH_SIZE = 1000
+
+
+async def bench_send(protocol, points, buffered):
+    carbon = FakeCarbon(protocol=protocol, keep_points=False)
+    await carbon.start()
+    dataset = [("servers.host%d.cpu.user" % (i % 100), i, 1471640923)
+               for i in range(points)]
+    kwargs = {'max_batch_points': BATCH_SIZE} if buffered else {}
+    client = AIOGraphite('127.0.0.1', carbon.port, protocol, **kwargs)
+    await client._connect()
+    start = time.perf_counter()
+    if buffered:
+        for metric, value, timestamp in dataset:
+            await client.send(metric, value, timestamp)
+        await client.flush()
+    else:
+        for i in range(0, points, BATCH_SIZE):
+            await client.send_multiple(dataset[i:i + BATCH_SIZE])
+    await carbon.wait_for_points(points)
+    elapsed = time.perf_counter() - start
+    await client.close()
+    await carbon.stop()
+    return points / elapsed
+
+
+def results(points=200000, repeat=3):
+    """
+    points/sec sent end-to-end for every protocol, the best of repeat
+    runs.
+    """
+    results = {}
+    for name, protocol in PROTOCOLS.items():
+        for mode in ('send_multiple', 'buffered'):
+            results[f"send.{name}.{mode}"] = max(
+                asyncio.run(bench_send(protocol(), points,
+                                       mode == 'buffered'))
+                for _ in range(repeat))
+    return results
+
+
+def main(points):
+    print(f"{'protocol':>9} {'send_multiple':>14} {'buffered':>14}"
+          f"   (points/sec)")
+    current = results(points)
+    for name in PROTOCOLS:
+        print(f"{name:>9} {current[f'send.{name}.send_multiple']:>14,.0f} "
+              f"{current[f'send.{name}.buffered']:>14,.0f}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+"""
+    Run every benchmark, and track the results to catch regressions.
+
+    Results are points (or parts) per second, higher being better. With
+    --save, they are written to a JSON file; with --compare, they are
+    checked against such a file, and the exit status is 1 if any result
+    is more than --tolerance slower than the baseline.
+
+    usage:
+
+        python benchmarks/run.py --save benchmarks/baseline.json
+        python benchmarks/run.py --compare benchmarks/baseline.json
+
+    Results depend on the machine: compare against a baseline saved on
+    the same machine, from the commit being changed.
+"""
+import argparse
+import json
+import platform
+import sys
+import bench_encoder
+import bench_protocol
+import bench_send
+
+
+def run():
+    results = {}
+    results.update(bench_protocol.results([100, 10000, 100000]))
+    results.update(bench_encoder.results())
+    results.update(bench_send.results())
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    Print every result next to its baseline, and return the names of the
+    results slower than the baseline by more than tolerance.
+    """
+    regressions = []
+    print(f"{'benchmark':<36} {'baseline':>14} {'current':>14} {'change':>8}")
+    for name, value in sorted(results.items()):
+        before = baseline.get(name)
+        if not before:
+            print(f"{name:<36} {'-':>14} {value:>14,.0f}")
+            continue
+        change = value / before - 1
+        flag = ''
+        if change < -tolerance:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print(f"{name:<36} {before:>14,.0f} {value:>14,.0f} "
+              f"{change:>+8.1%}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--save', metavar='FILE',
+                        help="write the results to FILE")
+    parser.add_argument('--compare', metavar='FILE',
+                        help="compare the results with the baseline FILE")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="slowdown allowed before failing (default 0.2)")
+    args = parser.parse_args(argv)
+    results = run()
+    status = 0
+    if args.compare:
+        with open(args.compare) as baseline:
+            baseline = json.load(baseline)['results']
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond "
+                  f"{args.tolerance:.0%}: {', '.join(regressions)}")
+            status = 1
+    else:
+        for name, value in sorted(results.items()):
+            print(f"{name:<36} {value:>14,.0f}")
+    if args.save:
+        with open(args.save, 'w') as output:
+            json.dump({
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'results': results,
+            }, output, indent=2, sort_keys=True)
+            output.write('\n')
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
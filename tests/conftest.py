@@ -1,4 +1,6 @@
+import asyncio
 import pytest
+import pytest_asyncio
 
 
 @pytest.fixture
@@ -23,3 +25,39 @@ def metric_value_timestamp_list():
     return [
         ('zillow', 124, 1471640958), ('trulia', 223, 1471640923),
         ('hotpad', 53534, 1471640943), ('streeteasy', 13424, 1471640989)]
+
+
+class RecordingClient:
+    """
+    Stands in for a client, recording every dataset sent as a dict.
+    """
+
+    def __init__(self):
+        self.sent = []
+
+    async def send_multiple(self, dataset, timestamp=None):
+        self.sent.append(dict(dataset))
+
+
+@pytest.fixture
+def recording_client():
+    return RecordingClient()
+
+
+@pytest_asyncio.fixture
+async def graphite_server():
+    received = []
+
+    async def handler(reader, writer):
+        while True:
+            data = await reader.read(65536)
+            if not data:
+                break
+            received.append(data)
+        writer.close()
+
+    server = await asyncio.start_server(handler, '127.0.0.1', 0)
+    port = server.sockets[0].getsockname()[1]
+    yield port, received
+    server.close()
+    await server.wait_closed()
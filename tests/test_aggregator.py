@@ -0,0 +1,60 @@
+import pytest
+from aiographite.aggregator import Aggregator, percentile
+
+
+@pytest.mark.parametrize("pct, expected", [
+    (0, 1), (50, 5), (90, 9), (99, 10), (100, 10),
+])
+def test_percentile(pct, expected):
+    assert percentile(list(range(1, 11)), pct) == expected
+
+
+@pytest.mark.asyncio
+async def test_aggregator_flush(recording_client):
+    aggregator = Aggregator(recording_client, percentiles=(50, 99.9))
+    for _ in range(1000):
+        aggregator.incr('hits')
+    aggregator.incr('bytes', 512)
+    aggregator.gauge('queue', 10)
+    aggregator.gauge('queue', -3, delta=True)
+    for value in (30, 10, 20, 40):
+        aggregator.timing('latency', value)
+    for user in ('a', 'b', 'a'):
+        aggregator.set_add('users', user)
+    with aggregator.timer('block'):
+        pass
+    await aggregator.flush()
+    points = recording_client.sent[0]
+    assert points['counters.hits.count'] == 1000
+    assert points['counters.bytes.count'] == 512
+    assert 'counters.hits.rate' in points
+    assert points['gauges.queue'] == 7
+    assert (points['timers.latency.count'], points['timers.latency.lower'],
+            points['timers.latency.upper'], points['timers.latency.mean'],
+            points['timers.latency.p50'],
+            points['timers.latency.p99_9']) == (4, 10, 40, 25, 20, 40)
+    assert points['sets.users.count'] == 2
+    assert points['timers.block.count'] == 1
+
+    await aggregator.flush()
+    assert recording_client.sent[1] == {'gauges.queue': 7}
+
+
+@pytest.mark.asyncio
+async def test_aggregator_metric_types_do_not_collide(recording_client):
+    aggregator = Aggregator(recording_client, timer_prefix='t.', set_prefix='')
+    aggregator.incr('x', 3)
+    aggregator.timing('x', 10)
+    aggregator.timing('x', 20)
+    aggregator.set_add('x', 'a')
+    await aggregator.flush()
+    points = recording_client.sent[0]
+    assert (points['counters.x.count'], points['t.x.count'],
+            points['x.count']) == (3, 2, 1)
+
+
+@pytest.mark.asyncio
+async def test_aggregator_flushes_on_stop(recording_client):
+    async with Aggregator(recording_client, interval=60) as aggregator:
+        aggregator.incr('hits')
+    assert recording_client.sent[0]['counters.hits.count'] == 1
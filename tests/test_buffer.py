@@ -0,0 +1,178 @@
+import asyncio
+import pytest
+from aiographite import AIOGraphite
+from aiographite import aiographite as aiographite_module
+from aiographite.buffer import (
+    MetricBuffer, POINT_OVERHEAD_BYTES, OVERFLOW_BLOCK,
+    OVERFLOW_DROP_NEWEST, OVERFLOW_DROP_OLDEST, OVERFLOW_SAMPLE,
+)
+from aiographite.protocol import PlaintextProtocol
+from aiographite.transport import MemoryTransport
+
+
+def test_buffer_max_points():
+    buffer = MetricBuffer(max_points=2)
+    buffer.add('a', 1, 100)
+    assert not buffer.is_full()
+    buffer.add('b', 2, 100)
+    assert buffer.is_full()
+    assert buffer.drain() == [('a', 1, 100), ('b', 2, 100)]
+    assert len(buffer) == 0
+    assert buffer.size_in_bytes == 0
+
+
+def test_buffer_max_bytes():
+    buffer = MetricBuffer(max_bytes=POINT_OVERHEAD_BYTES + 10)
+    buffer.add('a' * 5, 1, 100)
+    assert not buffer.is_full()
+    buffer.extend([('b' * 5, 2, 100)])
+    assert buffer.is_full()
+
+
+@pytest.mark.asyncio
+async def test_buffered_send_flushes_on_close(graphite_server):
+    port, received = graphite_server
+    aiographite = AIOGraphite('127.0.0.1', port, PlaintextProtocol(),
+                              max_batch_points=100)
+    await aiographite.send('metric1', 1, 1471640923)
+    await aiographite.send_multiple([('metric2', 2), ('metric3', 3)],
+                                    timestamp=1471640924)
+    assert aiographite._writer is None
+    await aiographite.close()
+    await asyncio.sleep(0.05)
+    assert b''.join(received) == (
+        b'metric1 1 1471640923\n'
+        b'metric2 2 1471640924\n'
+        b'metric3 3 1471640924\n')
+
+
+@pytest.mark.asyncio
+async def test_buffered_send_flushes_on_max_points(graphite_server):
+    port, received = graphite_server
+    async with AIOGraphite('127.0.0.1', port, PlaintextProtocol(),
+                           max_batch_points=2) as aiographite:
+        await aiographite.send('metric1', 1, 1471640923)
+        await aiographite.send('metric2', 2, 1471640923)
+        await asyncio.sleep(0.05)
+        assert len(aiographite._buffer) == 0
+        assert b''.join(received) == (
+            b'metric1 1 1471640923\nmetric2 2 1471640923\n')
+
+
+@pytest.mark.asyncio
+async def test_buffered_send_flushes_on_interval(graphite_server):
+    port, received = graphite_server
+    async with AIOGraphite('127.0.0.1', port, PlaintextProtocol(),
+                           flush_interval=0.01) as aiographite:
+        await aiographite.send('metric1', 1, 1471640923)
+        await asyncio.sleep(0.1)
+        assert b''.join(received) == b'metric1 1 1471640923\n'
+
+
+@pytest.mark.parametrize("policy, expected_points", [
+    (OVERFLOW_DROP_NEWEST, [('a', 1, 100), ('b', 2, 100)]),
+    (OVERFLOW_DROP_OLDEST, [('c', 3, 100), ('d', 4, 100)]),
+])
+def test_buffer_drop_policies(policy, expected_points):
+    buffer = MetricBuffer(max_size=2, overflow_policy=policy)
+    buffer.extend([('a', 1, 100), ('b', 2, 100),
+                   ('c', 3, 100), ('d', 4, 100)])
+    assert buffer.dropped_points == 2
+    assert buffer.drain() == expected_points
+
+
+def test_buffer_sample_policy():
+    buffer = MetricBuffer(max_size=10, overflow_policy=OVERFLOW_SAMPLE)
+    points = [('metric', i, 100) for i in range(1000)]
+    buffer.extend(points)
+    assert len(buffer) == 10
+    assert buffer.dropped_points == 990
+    assert set(buffer.drain()) <= set(points)
+
+
+def test_buffer_block_policy():
+    buffer = MetricBuffer(max_size=1, overflow_policy=OVERFLOW_BLOCK)
+    assert buffer.add('a', 1, 100)
+    assert buffer.is_full()
+    assert not buffer.add('b', 2, 100)
+    assert buffer.dropped_points == 0
+
+
+def test_buffer_unsupported_policy():
+    with pytest.raises(ValueError):
+        MetricBuffer(max_size=1, overflow_policy='unknown')
+
+
+@pytest.mark.asyncio
+async def test_bounded_queue_drops_while_server_unreachable():
+    aiographite = AIOGraphite('127.0.0.1', 1, PlaintextProtocol(),
+                              max_queue_points=2,
+                              overflow_policy=OVERFLOW_DROP_NEWEST)
+    await aiographite.send_multiple(
+        [('metric1', 1), ('metric2', 2), ('metric3', 3)])
+    assert aiographite.dropped_points == 1
+    with pytest.raises(Exception):
+        await aiographite.close()
+
+
+@pytest.mark.asyncio
+async def test_bounded_queue_blocks_until_flushed(graphite_server):
+    port, received = graphite_server
+    async with AIOGraphite('127.0.0.1', port, PlaintextProtocol(),
+                           max_queue_points=1) as aiographite:
+        await aiographite.send_multiple(
+            [('metric1', 1), ('metric2', 2), ('metric3', 3)],
+            timestamp=1471640923)
+        assert aiographite.dropped_points == 0
+    await asyncio.sleep(0.05)
+    assert b''.join(received) == (
+        b'metric1 1 1471640923\nmetric2 2 1471640923\n'
+        b'metric3 3 1471640923\n')
+
+
+@pytest.mark.asyncio
+async def test_bounded_queue_alone_flushes_periodically(monkeypatch):
+    monkeypatch.setattr(aiographite_module, 'DEFAULT_FLUSH_INTERVAL', 0.01)
+    transport = MemoryTransport()
+    aiographite = AIOGraphite('127.0.0.1', 2003, PlaintextProtocol(),
+                              max_queue_points=10, transport=transport)
+    await aiographite.send('metric1', 1, 1471640923)
+    await asyncio.sleep(0.05)
+    assert bytes(transport.data) == b'metric1 1 1471640923\n'
+    await aiographite.close()
+
+
+class SlowTransport(MemoryTransport):
+
+    async def send(self, message):
+        await asyncio.sleep(0.05)
+        await super().send(message)
+
+
+@pytest.mark.asyncio
+async def test_close_waits_for_flush_in_progress():
+    transport = SlowTransport()
+    aiographite = AIOGraphite('127.0.0.1', 2003, PlaintextProtocol(),
+                              max_batch_points=2, transport=transport)
+    await aiographite.send_multiple([('metric1', 1), ('metric2', 2)],
+                                    timestamp=1471640923)
+    await asyncio.sleep(0.01)
+    assert len(aiographite._buffer) == 0
+    await aiographite.close()
+    assert bytes(transport.data) == \
+        b'metric1 1 1471640923\nmetric2 2 1471640923\n'
+
+
+@pytest.mark.asyncio
+async def test_blocked_senders_survive_close():
+    transport = SlowTransport()
+    aiographite = AIOGraphite('127.0.0.1', 2003, PlaintextProtocol(),
+                              max_queue_points=1, transport=transport)
+    sending = asyncio.ensure_future(aiographite.send_multiple(
+        [('metric%d' % i, i) for i in range(4)], timestamp=1471640923))
+    await asyncio.sleep(0.01)
+    await aiographite.close()
+    await sending
+    await aiographite.close()
+    assert bytes(transport.data) == b''.join(
+        b'metric%d %d 1471640923\n' % (i, i) for i in range(4))
@@ -0,0 +1,157 @@
+import asyncio
+import pytest
+import types
+from aiographite import AIOGraphite
+from aiographite.aiographite import AioGraphiteSendException
+from aiographite.circuit import Backoff, CircuitBreaker, CLOSED, OPEN, \
+    HALF_OPEN
+from aiographite.protocol import PlaintextProtocol
+from aiographite.spool import DiskSpool
+from aiographite.transport import MemoryTransport
+
+
+class FlakyTransport(MemoryTransport):
+
+    def __init__(self, host=None, port=None):
+        super().__init__(host, port)
+        self.failing = True
+        self.connect_delay = 0
+        self.attempts = 0
+
+    async def connect(self):
+        await asyncio.sleep(self.connect_delay)
+        if self.failing:
+            raise AioGraphiteSendException("unreachable")
+        await super().connect()
+
+    async def send(self, message):
+        self.attempts += 1
+        if self.failing:
+            raise AioGraphiteSendException("unreachable")
+        await super().send(message)
+
+
+class FakeClock:
+
+    def __init__(self, monkeypatch):
+        self.now = 1000.0
+        monkeypatch.setattr('aiographite.circuit.time',
+                            types.SimpleNamespace(monotonic=self.monotonic))
+
+    def monotonic(self):
+        return self.now
+
+
+def test_backoff_grows_up_to_maximum():
+    backoff = Backoff(base=0.1, maximum=1.0, jitter=False)
+    assert [backoff.next_delay() for _ in range(6)] == \
+        [0.1, 0.2, 0.4, 0.8, 1.0, 1.0]
+    backoff.reset()
+    assert backoff.next_delay() == 0.1
+
+
+def test_backoff_jitter():
+    backoff = Backoff(base=1.0, maximum=1.0)
+    delays = [backoff.next_delay() for _ in range(100)]
+    assert all(0.5 <= delay <= 1.0 for delay in delays)
+    assert len(set(delays)) > 1
+
+
+def test_circuit_breaker_states(monkeypatch):
+    clock = FakeClock(monkeypatch)
+    breaker = CircuitBreaker(failure_threshold=2,
+                             backoff=Backoff(1.0, 10.0, jitter=False))
+    breaker.record_failure()
+    assert breaker.state == CLOSED and breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == OPEN and not breaker.allow_request()
+    assert breaker.retry_after == 1.0
+    assert not breaker.begin_probe()
+    clock.now += 1.0
+    assert breaker.begin_probe()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow_request() and not breaker.begin_probe()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    clock.now += 1.5
+    assert not breaker.begin_probe()
+    clock.now += 0.5
+    assert breaker.begin_probe()
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.failures == 0
+    assert breaker.allow_request()
+
+
+def make_client(**kwargs):
+    breaker = CircuitBreaker(failure_threshold=1,
+                             backoff=Backoff(0.01, jitter=False))
+    return AIOGraphite('127.0.0.1', 2003, PlaintextProtocol(),
+                       transport=FlakyTransport, circuit_breaker=breaker,
+                       **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_open_circuit_drops_without_sending():
+    aiographite = make_client()
+    transport = aiographite.transport
+    with pytest.raises(AioGraphiteSendException):
+        await aiographite.send('metric1', 1, 1471640923)
+    await aiographite.send('metric2', 2, 1471640923)
+    assert transport.attempts == 1
+    assert aiographite.dropped_messages == 1
+
+    transport.failing = False
+    await asyncio.sleep(0.05)
+    assert aiographite.circuit_breaker.state == CLOSED
+    assert transport.is_connected
+    await aiographite.send('metric3', 3, 1471640923)
+    await aiographite.close()
+    assert bytes(transport.data) == b'metric3 3 1471640923\n'
+
+
+@pytest.mark.asyncio
+async def test_open_circuit_spools(tmp_path):
+    spool = DiskSpool(str(tmp_path))
+    aiographite = make_client(spool=spool)
+    transport = aiographite.transport
+    await aiographite.send('metric1', 1, 1471640923)
+    await aiographite.send('metric2', 2, 1471640923)
+    assert transport.attempts == 1
+    assert aiographite.dropped_messages == 0
+
+    transport.failing = False
+    await asyncio.sleep(0.05)
+    assert not spool
+    await aiographite.send('metric3', 3, 1471640923)
+    await aiographite.close()
+    assert bytes(transport.data) == (
+        b'metric1 1 1471640923\nmetric2 2 1471640923\n'
+        b'metric3 3 1471640923\n')
+
+
+class BrokenSpool(DiskSpool):
+
+    def append(self, message):
+        raise OSError(28, "No space left on device")
+
+
+@pytest.mark.asyncio
+async def test_spool_failure_drops_message(tmp_path):
+    aiographite = make_client(spool=BrokenSpool(str(tmp_path)))
+    await aiographite.send('metric1', 1, 1471640923)
+    await aiographite.send('metric2', 2, 1471640923)
+    assert aiographite.dropped_messages == 2
+    await aiographite.close()
+
+
+@pytest.mark.asyncio
+async def test_cancelled_probe_reopens_circuit():
+    aiographite = make_client()
+    transport = aiographite.transport
+    transport.connect_delay = 1
+    with pytest.raises(AioGraphiteSendException):
+        await aiographite.send('metric1', 1, 1471640923)
+    await asyncio.sleep(0.05)
+    assert aiographite.circuit_breaker.state == HALF_OPEN
+    await aiographite.close()
+    assert aiographite.circuit_breaker.state == OPEN
@@ -0,0 +1,103 @@
+import array
+import asyncio
+import pytest
+from aiographite import AIOGraphite
+from aiographite.protocol import PlaintextProtocol, PickleProtocol
+
+
+@pytest.mark.parametrize("max_batch_points", [None, 100])
+@pytest.mark.asyncio
+async def test_send_columns(graphite_server, max_batch_points):
+    port, received = graphite_server
+    async with AIOGraphite('127.0.0.1', port, PlaintextProtocol(),
+                           max_batch_points=max_batch_points) as aiographite:
+        await aiographite.send_columns(
+            ['metric1', 'metric2'], array.array('d', [1.5, 2]),
+            1471640923)
+        await aiographite.send_columns(
+            ('metric3',), [3], [1471640924])
+    await asyncio.sleep(0.05)
+    assert b''.join(received) == (
+        b'metric1 1.5 1471640923\nmetric2 2.0 1471640923\n'
+        b'metric3 3 1471640924\n')
+
+
+@pytest.mark.parametrize("max_batch_points", [None, 100])
+@pytest.mark.asyncio
+async def test_send_columns_length_mismatch(max_batch_points):
+    aiographite = AIOGraphite('127.0.0.1', 1, PlaintextProtocol(),
+                              max_batch_points=max_batch_points)
+    with pytest.raises(ValueError):
+        await aiographite.send_columns(['metric1', 'metric2', 'metric3'],
+                                       [1], 100)
+    assert aiographite._buffer is None or len(aiographite._buffer) == 0
+
+
+@pytest.mark.asyncio
+async def test_send_stream_from_generators(graphite_server):
+    port, received = graphite_server
+
+    async def async_points():
+        for i in range(3):
+            yield ('metric%d' % i, i)
+
+    sync_points = (('metric%d' % i, i) for i in range(3, 5))
+    async with AIOGraphite('127.0.0.1', port,
+                           PlaintextProtocol()) as aiographite:
+        await aiographite.send_stream(async_points(), chunk_size=2,
+                                      timestamp=1471640923)
+        await aiographite.send_stream(sync_points, chunk_size=2,
+                                      timestamp=1471640923)
+    await asyncio.sleep(0.05)
+    assert b''.join(received) == b''.join(
+        b'metric%d %d 1471640923\n' % (i, i) for i in range(5))
+
+
+@pytest.mark.asyncio
+async def test_send_stream_frames_each_chunk(graphite_server):
+    port, received = graphite_server
+    dataset = [('metric%d' % i, i, 1471640923) for i in range(5)]
+    async with AIOGraphite('127.0.0.1', port,
+                           PickleProtocol()) as aiographite:
+        await aiographite.send_stream(iter(dataset), chunk_size=2)
+    await asyncio.sleep(0.05)
+    pickle = PickleProtocol()
+    assert b''.join(received) == b''.join([
+        pickle.generate_message(dataset[0:2]),
+        pickle.generate_message(dataset[2:4]),
+        pickle.generate_message(dataset[4:]),
+    ])
+
+
+@pytest.mark.parametrize("max_batch_points", [None, 100])
+@pytest.mark.asyncio
+async def test_metric_handle(graphite_server, max_batch_points):
+    port, received = graphite_server
+    async with AIOGraphite('127.0.0.1', port, PlaintextProtocol(),
+                           max_batch_points=max_batch_points) as aiographite:
+        handle = aiographite.metric(['web', 'velo@zillow.com', 'hits'])
+        assert handle.name == 'web-.velo%40zillow%2Ecom-.hits-'
+        with pytest.raises(AttributeError):
+            handle.unknown = 1
+        await handle.send(1.5, 1471640923)
+        await handle.inc(timestamp=1471640924)
+        await handle.inc(2, timestamp=1471640925)
+    await asyncio.sleep(0.05)
+    assert b''.join(received) == (
+        b'web-.velo%40zillow%2Ecom-.hits- 1.5 1471640923\n'
+        b'web-.velo%40zillow%2Ecom-.hits- 1 1471640924\n'
+        b'web-.velo%40zillow%2Ecom-.hits- 3 1471640925\n')
+
+
+@pytest.mark.parametrize("max_batch_points", [None, 100])
+@pytest.mark.asyncio
+async def test_send_multiple_writes_every_frame(graphite_server,
+                                                max_batch_points):
+    port, received = graphite_server
+    protocol = PickleProtocol(memo=False, max_frame_points=2)
+    dataset = [('metric%d' % i, i, 1471640923) for i in range(5)]
+    async with AIOGraphite('127.0.0.1', port, protocol,
+                           max_batch_points=max_batch_points) as aiographite:
+        await aiographite.send_multiple(dataset)
+    await asyncio.sleep(0.05)
+    assert b''.join(received) == protocol.generate_message(dataset)
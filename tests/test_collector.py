@@ -0,0 +1,107 @@
+import asyncio
+import multiprocessing
+import pytest
+import time
+from aiographite.collector import Collector, CollectorClient
+
+
+def worker(path, worker_id):
+    with CollectorClient(path) as client:
+        for _ in range(10):
+            client.incr('web.hits')
+        client.set_add('web.workers', worker_id)
+
+
+@pytest.mark.asyncio
+async def test_collector_aggregates_events(tmp_path, recording_client):
+    path = str(tmp_path / 'metrics.sock')
+    async with Collector(path, recording_client, interval=60) as collector:
+        with CollectorClient(path) as events:
+            events.incr('hits')
+            events.incr('hits', 2)
+            events.gauge('queue', 1.5)
+            events.timing('latency', 10)
+            with events.timer('block'):
+                pass
+            events.set_add('users', 'a:b')
+            events.set_add('users', 'a:b')
+            events._socket.sendto(b'nonsense\n:1|c\nx:y|c', path)
+        await asyncio.sleep(0.05)
+    assert collector.received == 7
+    assert collector.malformed == 3
+    points = recording_client.sent[0]
+    assert points['counters.hits.count'] == 3
+    assert points['gauges.queue'] == 1.5
+    assert points['timers.latency.upper'] == 10
+    assert points['timers.block.count'] == 1
+    assert points['sets.users.count'] == 1
+
+
+@pytest.mark.asyncio
+async def test_collector_merges_worker_processes(tmp_path, recording_client):
+    path = str(tmp_path / 'metrics.sock')
+    context = multiprocessing.get_context('fork')
+    async with Collector(path, recording_client, interval=60):
+        workers = [context.Process(target=worker, args=(path, i))
+                   for i in range(3)]
+        for process in workers:
+            process.start()
+        for process in workers:
+            await asyncio.get_running_loop().run_in_executor(
+                None, process.join)
+        await asyncio.sleep(0.05)
+    assert recording_client.sent[0]['counters.web.hits.count'] == 30
+    assert recording_client.sent[0]['sets.web.workers.count'] == 3
+
+
+def test_collector_client_drops_without_collector(tmp_path):
+    with CollectorClient(str(tmp_path / 'missing.sock')) as client:
+        client.incr('hits')
+        client.incr('hits')
+    assert client.dropped == 2
+
+
+class FakeSocket:
+
+    def __init__(self):
+        self.datagrams = []
+
+    def sendto(self, data, path):
+        self.datagrams.append(data)
+
+    def close(self):
+        pass
+
+
+def test_collector_client_packs_events():
+    client = CollectorClient('unused', max_datagram_size=20)
+    client._socket = sock = FakeSocket()
+    for _ in range(4):
+        client.incr('hits')
+    assert sock.datagrams == [b'hits:1|c\nhits:1|c']
+    client.close()
+    assert sock.datagrams[1:] == [b'hits:1|c\nhits:1|c']
+
+
+def test_collector_client_flushes_idle_events():
+    client = CollectorClient('unused', flush_interval=0.02)
+    client._socket = sock = FakeSocket()
+    client.incr('hits')
+    client.incr('hits')
+    assert sock.datagrams == []
+    for _ in range(100):
+        if sock.datagrams:
+            break
+        time.sleep(0.01)
+    assert sock.datagrams == [b'hits:1|c\nhits:1|c']
+    client.incr('misses')
+    client.close()
+    assert sock.datagrams[1:] == [b'misses:1|c']
+
+
+def test_collector_client_unpacked_events():
+    client = CollectorClient('unused', flush_interval=None)
+    client._socket = sock = FakeSocket()
+    client.gauge('queue', 1)
+    client.timing('latency', 2.5)
+    assert sock.datagrams == [b'queue:1|g', b'latency:2.5|ms']
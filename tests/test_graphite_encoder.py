@@ -2,7 +2,8 @@
 # -*- coding: utf-8 -*-
 
 import pytest
-from aiographite.graphite_encoder import GraphiteEncoder
+import threading
+from aiographite.graphite_encoder import GraphiteEncoder, LRUCache
 
 
 @pytest.mark.parametrize("name", [
@@ -41,3 +42,62 @@ def test_encode_invalid_input(name):
 def test_decode_invalid_input(name):
     with pytest.raises(Exception):
         GraphiteEncoder.decode(name)
+
+
+@pytest.mark.parametrize("name", [
+    'abc_edf',
+    'ABC-0123~',
+    'a/b',
+    'a.b',
+    '',
+])
+def test_encode_fast_path_matches_punycode(name):
+    assert GraphiteEncoder.encode(name) == GraphiteEncoder._encode(name)
+
+
+def test_encode_cache_info():
+    GraphiteEncoder.configure_cache(maxsize=2)
+    GraphiteEncoder.encode('abc @edf#')
+    GraphiteEncoder.encode('abc @edf#')
+    GraphiteEncoder.encode('plain_ascii')
+    GraphiteEncoder.encode('汉 字')
+    GraphiteEncoder.encode('a.b')
+    info = GraphiteEncoder.cache_info()['parts']
+    assert (info.hits, info.misses, info.maxsize, info.currsize) == \
+        (1, 3, 2, 2)
+    GraphiteEncoder.configure_cache()
+
+
+def test_join_metric_parts_cache():
+    GraphiteEncoder.configure_cache()
+    metric_parts = ['sproc performance', 'velo@zillow.com', '::EH12']
+    expected_metric_name = \
+        'sproc%20performance-.velo%40zillow%2Ecom-.%3A%3AEH12-'
+    assert GraphiteEncoder.join_metric_parts(metric_parts) == \
+        expected_metric_name
+    assert GraphiteEncoder.join_metric_parts(metric_parts) == \
+        expected_metric_name
+    info = GraphiteEncoder.cache_info()['names']
+    assert (info.hits, info.misses) == (1, 1)
+
+
+def test_cache_shared_by_threads():
+    cache = LRUCache(maxsize=8)
+    errors = []
+
+    def worker(offset):
+        try:
+            for i in range(20000):
+                key = (i + offset) % 16
+                assert cache.get(key, lambda key: key * 2) == key * 2
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(offset,))
+               for offset in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert cache.info().currsize == 8
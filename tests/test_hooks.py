@@ -0,0 +1,77 @@
+import pytest
+from aiographite import AIOGraphite, MemoryTransport
+from aiographite.circuit import CircuitBreaker
+from aiographite.hooks import ClientHooks
+from aiographite.transport import TCPTransport
+
+
+class RecordingHooks(ClientHooks):
+
+    def __init__(self):
+        self.calls = []
+
+    def pre_encode(self, points):
+        self.calls.append(('pre_encode', points))
+
+    def post_encode(self, points, size, elapsed):
+        assert elapsed >= 0
+        self.calls.append(('post_encode', points, size))
+
+    def pre_write(self, points, size):
+        self.calls.append(('pre_write', points, size))
+
+    def post_drain(self, points, size, elapsed):
+        assert elapsed >= 0
+        self.calls.append(('post_drain', points, size))
+
+    def on_retry(self, attempt, error):
+        self.calls.append(('on_retry', attempt))
+
+    def on_drop(self, points, reason):
+        self.calls.append(('on_drop', points, reason))
+
+
+@pytest.mark.asyncio
+async def test_hooks_around_encode_and_send():
+    hooks = RecordingHooks()
+    async with AIOGraphite('127.0.0.1', transport=MemoryTransport(),
+                           hooks=hooks) as client:
+        await client.send_multiple([('a', 1), ('b', 2)], 1471640923)
+    size = len(b'a 1 1471640923\nb 2 1471640923\n')
+    assert hooks.calls == [
+        ('pre_encode', 2), ('post_encode', 2, size),
+        ('pre_write', 2, size), ('post_drain', 2, size)]
+
+
+@pytest.mark.asyncio
+async def test_hooks_on_retry(graphite_server):
+    port, _ = graphite_server
+    hooks = RecordingHooks()
+    transport = TCPTransport('127.0.0.1', port)
+    async with AIOGraphite('127.0.0.1', transport=transport,
+                           hooks=hooks) as client:
+        await client.send('metric', 1)
+        # a write on a closed writer fails, and is retried
+        transport._writer.close()
+        transport.is_alive = lambda: True
+        await client.send('metric', 2)
+    assert ('on_retry', 1) in hooks.calls
+
+
+@pytest.mark.asyncio
+async def test_hooks_on_drop():
+    hooks = RecordingHooks()
+    client = AIOGraphite('127.0.0.1', transport=MemoryTransport(),
+                         max_queue_points=1, overflow_policy='drop_newest',
+                         max_batch_points=10, hooks=hooks)
+    await client.send_multiple([('a', 1), ('b', 2), ('c', 3)])
+    assert hooks.calls == [('on_drop', 2, 'queue_full')]
+    await client.close()
+
+    hooks.calls = []
+    breaker = CircuitBreaker(failure_threshold=1)
+    breaker.record_failure()
+    client = AIOGraphite('127.0.0.1', transport=MemoryTransport(),
+                         circuit_breaker=breaker, hooks=hooks)
+    await client.send('metric', 1)
+    assert hooks.calls[-1] == ('on_drop', 1, 'circuit_open')
@@ -0,0 +1,48 @@
+import asyncio
+import pytest
+from aiographite import AIOGraphitePool, connect_pool
+from aiographite.aiographite import AioGraphiteSendException
+from aiographite.protocol import PlaintextProtocol
+
+
+@pytest.mark.asyncio
+async def test_pool_spreads_connections_over_endpoints(graphite_server):
+    port, received = graphite_server
+    pool = AIOGraphitePool([('127.0.0.1', port), ('127.0.0.1', port)],
+                           size=4, protocol=PlaintextProtocol())
+    assert len(pool._members) == 4
+    await pool.connect()
+    assert pool.healthy_size == 4
+    await asyncio.gather(*[
+        pool.send('metric%d' % i, i, 1471640923) for i in range(8)
+    ])
+    await pool.close()
+    await asyncio.sleep(0.05)
+    lines = b''.join(received).splitlines()
+    assert sorted(lines) == sorted(
+        b'metric%d %d 1471640923' % (i, i) for i in range(8))
+
+
+@pytest.mark.asyncio
+async def test_pool_skips_unreachable_endpoint(graphite_server):
+    port, received = graphite_server
+    async with await connect_pool(
+            [('127.0.0.1', port), ('127.0.0.1', 1)], size=2,
+            reconnect_interval=10) as pool:
+        assert pool.healthy_size == 1
+        assert len(pool._reconnect_tasks) == 1
+        await pool.send_multiple([('metric1', 1), ('metric2', 2)],
+                                 timestamp=1471640923)
+    await asyncio.sleep(0.05)
+    assert b''.join(received) == (
+        b'metric1 1 1471640923\nmetric2 2 1471640923\n')
+
+
+@pytest.mark.asyncio
+async def test_pool_raises_without_healthy_connection():
+    pool = AIOGraphitePool([('127.0.0.1', 1)], size=2, reconnect_interval=10)
+    with pytest.raises(AioGraphiteSendException):
+        await pool.connect()
+    with pytest.raises(AioGraphiteSendException):
+        await pool.send('metric', 1)
+    await pool.close()
@@ -0,0 +1,192 @@
+import array
+import pickle
+import pytest
+import struct
+from aiographite.protocol import PlaintextProtocol, PickleProtocol
+
+
+def loads_frame(message):
+    (length,) = struct.unpack("!L", message[:4])
+    assert length == len(message) - 4
+    return pickle.loads(message[4:])
+
+
+def legacy_plaintext_message(tuple_list):
+    plaintext = PlaintextProtocol()
+    return "".join([
+        plaintext._format_data(metric, value, timestamp)
+        for metric, value, timestamp in tuple_list
+    ]).encode('ascii')
+
+
+@pytest.mark.parametrize("tuple_list", [
+    [],
+    [("metric1", 455, 1471640924)],
+    [("metric1", 4.55, 1471640924), ("metric2", -1, 1471640923.5),
+     ("metric%25", 1e-07, 1471640925), ("metric4", True, 0)],
+    [["metric1", 455, 1471640924], ["metric2", 123, 1471640923]],
+])
+def test_plaintext_generate_message_matches_format_data(tuple_list):
+    plaintext = PlaintextProtocol()
+    assert plaintext.generate_message(tuple_list) == \
+        legacy_plaintext_message(tuple_list)
+
+
+@pytest.mark.parametrize("tuple_list", [
+    [("metric1", 455, 1471640924), ("metric2", 123, 1471640923)],
+    [["metric1", 455, 1471640924], ["metric2", 123, 1471640923]],
+])
+def test_plaintext_generate_message_from_iterator(tuple_list):
+    plaintext = PlaintextProtocol()
+    assert plaintext.generate_message(iter(tuple_list)) == \
+        plaintext.generate_message(
+            (tuple(data) for data in tuple_list)) == \
+        legacy_plaintext_message(tuple_list)
+
+
+def test_plaintext_generate_message_invalid_tuple():
+    with pytest.raises(ValueError):
+        PlaintextProtocol().generate_message([("metric1", 455)])
+
+
+@pytest.mark.parametrize("values, timestamps", [
+    ([455, 12.5, 987], [1471640924, 1471640923, 1471640925]),
+    (array.array('d', [455, 12.5, 987]), 1471640924),
+    ((455, 12, 987), array.array('q', [1471640924, 1471640923, 0])),
+])
+def test_plaintext_generate_message_from_columns(values, timestamps):
+    metrics = ["metric1", "metric2", "metric3"]
+    ts_column = timestamps
+    if isinstance(timestamps, int):
+        ts_column = [timestamps] * 3
+    expected_message = legacy_plaintext_message(
+        zip(metrics, list(values), list(ts_column)))
+    plaintext = PlaintextProtocol()
+    message = plaintext.generate_message_from_columns(
+        metrics, values, timestamps)
+    assert message == expected_message
+
+
+def test_plaintext_generate_message_from_numpy_columns():
+    np = pytest.importorskip("numpy")
+    plaintext = PlaintextProtocol()
+    message = plaintext.generate_message_from_columns(
+        np.array(["metric1", "metric2"]), np.array([1.5, 2.0]),
+        np.array([1471640924, 1471640925]))
+    assert message == b"metric1 1.5 1471640924\nmetric2 2.0 1471640925\n"
+
+
+def test_plaintext_columns_length_mismatch():
+    with pytest.raises(ValueError):
+        PlaintextProtocol().generate_message_from_columns(
+            ["metric1", "metric2"], [1], 1471640924)
+
+
+@pytest.mark.parametrize("timestamps", [
+    [123, 123, 876],
+    array.array('q', [123, 123, 876]),
+])
+def test_pickle_generate_message_from_columns(timestamps):
+    protocol = PickleProtocol()
+    tuple_list = [('a', 456, 123), ('b', 456, 123), ('c', 987, 876)]
+    message = protocol.generate_message_from_columns(
+        ['a', 'b', 'c'], array.array('q', [456, 456, 987]), timestamps)
+    assert message == protocol.generate_message(tuple_list)
+
+
+def test_pickle_generate_message_from_columns_shared_timestamp():
+    protocol = PickleProtocol()
+    tuple_list = [('a', 1.5, 123), ('b', 2, 123)]
+    message = protocol.generate_message_from_columns(['a', 'b'], [1.5, 2], 123)
+    assert message == protocol.generate_message(tuple_list)
+
+
+@pytest.mark.parametrize("protocol", [PlaintextProtocol(), PickleProtocol()])
+@pytest.mark.parametrize("value", [455, 4.5])
+def test_generate_point_message(protocol, value):
+    prepared_metric = protocol.prepare_metric("metric1")
+    message = protocol.generate_point_message(
+        prepared_metric, value, 1471640924)
+    assert message == protocol.generate_message(
+        [("metric1", value, 1471640924)])
+
+
+def test_generate_message_for_pickle_without_memo():
+    protocol = PickleProtocol(memo=False)
+    tuple_list = [('a', 456, 123), ('b', 456, 123), ('c', 987.5, 876)]
+    expected_message = (
+        b'\x00\x00\x004\x80\x02](X\x01\x00\x00\x00aK{M\xc8\x01\x86\x86'
+        b'X\x01\x00\x00\x00bK{M\xc8\x01\x86\x86X\x01\x00\x00\x00cM'
+        b'l\x03G@\x8e\xdc\x00\x00\x00\x00\x00\x86\x86e.')
+    message = protocol.generate_message(tuple_list)
+    assert message == expected_message
+    assert b'q\x01' not in message
+    assert loads_frame(message) == loads_frame(
+        PickleProtocol().generate_message(tuple_list))
+
+
+def test_pickle_without_memo_columns_and_points():
+    protocol = PickleProtocol(memo=False)
+    assert protocol.generate_message_from_columns(['a', 'b'], [1, 2], 123) == \
+        protocol.generate_message([('a', 1, 123), ('b', 2, 123)])
+    assert protocol.generate_point_message('a', 1, 123) == \
+        protocol.generate_message([('a', 1, 123)])
+
+
+def split_frames(message):
+    frames = []
+    while message:
+        (length,) = struct.unpack("!L", message[:4])
+        frames.append(pickle.loads(message[4:4 + length]))
+        message = message[4 + length:]
+    return frames
+
+
+@pytest.mark.parametrize("memo", [True, False])
+def test_pickle_splits_frames_by_points(memo):
+    protocol = PickleProtocol(memo=memo, max_frame_points=2)
+    tuple_list = [('metric%d' % i, i, 123) for i in range(5)]
+    message = protocol.generate_message(tuple_list)
+    single_frame_protocol = PickleProtocol(memo=memo)
+    assert message == b''.join([
+        single_frame_protocol.generate_message(tuple_list[0:2]),
+        single_frame_protocol.generate_message(tuple_list[2:4]),
+        single_frame_protocol.generate_message(tuple_list[4:]),
+    ])
+
+
+@pytest.mark.parametrize("memo", [True, False])
+@pytest.mark.parametrize("size", [100, 1000])
+def test_pickle_splits_frames_by_bytes(memo, size):
+    protocol = PickleProtocol(memo=memo, max_frame_bytes=1024)
+    tuple_list = [('servers.host%d.cpu' % i, i * 1.5, 123 + i)
+                  for i in range(size)]
+    message = protocol.generate_message(tuple_list)
+    frames = split_frames(message)
+    assert len(frames) > 1
+    assert [point for frame in frames for point in frame] == \
+        [(metric, (timestamp, value))
+         for metric, value, timestamp in tuple_list]
+    position = 0
+    while position < len(message):
+        (length,) = struct.unpack("!L", message[position:position + 4])
+        assert length <= 1024
+        position += 4 + length
+
+
+def test_pickle_oversized_point_gets_its_own_frame():
+    protocol = PickleProtocol(max_frame_bytes=16)
+    tuple_list = [('a' * 64, 1, 123), ('b', 2, 123)]
+    assert split_frames(protocol.generate_message(tuple_list)) == [
+        [('a' * 64, (123, 1))], [('b', (123, 2))]]
+
+
+@pytest.mark.parametrize("protocol", [
+    PlaintextProtocol(),
+    PickleProtocol(max_frame_points=2),
+    PickleProtocol(memo=False, max_frame_points=2),
+])
+def test_generate_buffers(protocol):
+    tuple_list = [('metric%d' % i, i, 123) for i in range(5)]
+    buffers = protocol.generate_buffers(tuple_list)
+    assert b''.join(buffers) == protocol.generate_message(tuple_list)
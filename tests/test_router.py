@@ -0,0 +1,75 @@
+import asyncio
+import pytest
+from aiographite.aiographite import AioGraphiteSendException
+from aiographite.protocol import PlaintextProtocol
+from aiographite.router import (
+    AIOGraphiteRouter, ConsistentHashRing, parse_destination
+)
+
+
+NODES = [('127.0.0.1', 'a'), ('127.0.0.1', 'b'), ('127.0.0.2', None)]
+
+
+@pytest.mark.parametrize("destination, expected", [
+    ('127.0.0.1:2003', ('127.0.0.1', 2003, None)),
+    ('127.0.0.1:2004:a', ('127.0.0.1', 2004, 'a')),
+    (('127.0.0.1', '2003'), ('127.0.0.1', 2003, None)),
+    (('127.0.0.1', 2003, 'b'), ('127.0.0.1', 2003, 'b')),
+])
+def test_parse_destination(destination, expected):
+    assert parse_destination(destination) == expected
+
+
+def test_parse_invalid_destination():
+    with pytest.raises(AioGraphiteSendException):
+        parse_destination('127.0.0.1')
+
+
+# Expected nodes computed with carbon's own carbon.hashing module.
+@pytest.mark.parametrize("metric, expected_nodes", [
+    ('zillow', [('127.0.0.1', 'a'), ('127.0.0.2', None), ('127.0.0.1', 'b')]),
+    ('hotpad', [('127.0.0.2', None), ('127.0.0.1', 'b'), ('127.0.0.1', 'a')]),
+    ('streeteasy',
+     [('127.0.0.1', 'b'), ('127.0.0.1', 'a'), ('127.0.0.2', None)]),
+])
+def test_ring_matches_carbon(metric, expected_nodes):
+    ring = ConsistentHashRing(NODES)
+    assert len(ring.ring) == 300
+    assert ring.compute_ring_position('x') == 40404
+    assert ring.get_node(metric) == expected_nodes[0]
+    assert list(ring.get_nodes(metric)) == expected_nodes
+
+
+def test_router_replication():
+    router = AIOGraphiteRouter(
+        ['127.0.0.1:2003:a', '127.0.0.1:2103:b', '127.0.0.2:2003'],
+        replication_factor=2)
+    assert list(router.get_destinations('hotpad')) == [
+        ('127.0.0.2', None), ('127.0.0.1', 'b')]
+    router.diverse_replicas = True
+    assert list(router.get_destinations('zillow')) == [
+        ('127.0.0.1', 'a'), ('127.0.0.2', None)]
+
+
+@pytest.mark.asyncio
+async def test_router_shards_by_metric_name(graphite_server):
+    port_a, received_a = graphite_server
+    received_b = []
+
+    async def handler(reader, writer):
+        received_b.append(await reader.read())
+        writer.close()
+
+    server_b = await asyncio.start_server(handler, '127.0.0.1', 0)
+    port_b = server_b.sockets[0].getsockname()[1]
+    async with AIOGraphiteRouter(
+            [('127.0.0.1', port_a, 'a'), ('127.0.0.1', port_b, 'b')],
+            protocol=PlaintextProtocol()) as router:
+        await router.send_multiple(
+            [('zillow', 1), ('trulia', 2), ('streeteasy', 3)],
+            timestamp=1471640923)
+    await asyncio.sleep(0.05)
+    server_b.close()
+    assert b''.join(received_a) == (
+        b'zillow 1 1471640923\ntrulia 2 1471640923\n')
+    assert b''.join(received_b) == b'streeteasy 3 1471640923\n'
@@ -0,0 +1,126 @@
+import asyncio
+import os
+import pytest
+from aiographite import AIOGraphite
+from aiographite.protocol import PlaintextProtocol
+from aiographite.spool import DiskSpool, EVICT_NEWEST
+
+
+def replay_all(spool):
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(spool.replay(send))
+    return messages
+
+
+def test_spool_replays_in_order_across_segments(tmp_path):
+    spool = DiskSpool(str(tmp_path), segment_bytes=16)
+    for i in range(5):
+        assert spool.append(b'message%d' % i)
+    assert len(os.listdir(tmp_path)) == 5
+    assert spool.pending_bytes == 5 * (4 + 8)
+    assert replay_all(spool) == [b'message%d' % i for i in range(5)]
+    assert not spool
+    assert os.listdir(tmp_path) == []
+
+
+def test_spool_survives_restart(tmp_path):
+    spool = DiskSpool(str(tmp_path))
+    spool.append(b'message0')
+    spool.append(b'message1')
+    spool.close()
+    spool = DiskSpool(str(tmp_path))
+    spool.append(b'message2')
+    assert replay_all(spool) == [b'message0', b'message1', b'message2']
+
+
+def test_spool_evicts_oldest_segments(tmp_path):
+    spool = DiskSpool(str(tmp_path), max_bytes=36, segment_bytes=12)
+    for i in range(5):
+        assert spool.append(b'message%d' % i)
+    assert spool.dropped_bytes == 24
+    assert replay_all(spool) == [b'message2', b'message3', b'message4']
+
+
+def test_spool_drops_newest(tmp_path):
+    spool = DiskSpool(str(tmp_path), max_bytes=24, eviction=EVICT_NEWEST)
+    assert spool.append(b'message0')
+    assert spool.append(b'message1')
+    assert not spool.append(b'message2')
+    assert spool.dropped_bytes == 12
+    assert replay_all(spool) == [b'message0', b'message1']
+
+
+@pytest.mark.parametrize("tail", [b'\x00\x00', b'\x00\x00\x00\x05wo'])
+def test_spool_skips_torn_record(tmp_path, tail):
+    spool = DiskSpool(str(tmp_path))
+    spool.append(b'hello')
+    spool.close()
+    with open(tmp_path / os.listdir(tmp_path)[0], 'ab') as segment:
+        segment.write(tail)
+    spool = DiskSpool(str(tmp_path))
+    spool.append(b'world')
+    assert replay_all(spool) == [b'hello', b'world']
+    assert spool.dropped_bytes == len(tail)
+    assert os.listdir(tmp_path) == []
+
+
+def test_spool_keeps_message_when_replay_fails(tmp_path):
+    spool = DiskSpool(str(tmp_path))
+    spool.append(b'message0')
+
+    async def send(message):
+        raise ConnectionError()
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(spool.replay(send))
+    assert replay_all(spool) == [b'message0']
+
+
+@pytest.mark.asyncio
+async def test_spool_rate_limit(tmp_path):
+    spool = DiskSpool(str(tmp_path), replay_rate=1000)
+    spool.append(b'x' * 50)
+    spool.append(b'x' * 50)
+
+    async def send(message):
+        pass
+
+    start = asyncio.get_running_loop().time()
+    assert await spool.replay(send) == 100
+    assert asyncio.get_running_loop().time() - start >= 0.09
+
+
+@pytest.mark.asyncio
+async def test_client_spools_while_server_unreachable(tmp_path):
+    received = []
+
+    async def handler(reader, writer):
+        received.append(await reader.read())
+        writer.close()
+
+    server = await asyncio.start_server(handler, '127.0.0.1', 0)
+    port = server.sockets[0].getsockname()[1]
+    server.close()
+    await server.wait_closed()
+
+    spool = DiskSpool(str(tmp_path))
+    aiographite = AIOGraphite('127.0.0.1', port, PlaintextProtocol(),
+                              spool=spool)
+    await aiographite.send('metric1', 1, 1471640923)
+    await aiographite.send('metric2', 2, 1471640923)
+    assert spool.pending_bytes > 0
+
+    server = await asyncio.start_server(handler, '127.0.0.1', port)
+    await aiographite.send('metric3', 3, 1471640923)
+    await asyncio.sleep(0.05)
+    assert not spool
+    await aiographite.close()
+    await asyncio.sleep(0.05)
+    server.close()
+    assert b''.join(received) == (
+        b'metric3 3 1471640923\n'
+        b'metric1 1 1471640923\nmetric2 2 1471640923\n')
@@ -0,0 +1,96 @@
+import asyncio
+import pytest
+from aiographite import AIOGraphite, MemoryTransport
+from aiographite.aiographite import AioGraphiteSendException
+from aiographite.protocol import PlaintextProtocol
+from aiographite.stats import ClientStats, Histogram, SIZE_BUCKETS
+from aiographite.transport import TCPTransport
+
+
+def test_histogram_percentile():
+    histogram = Histogram((1, 10, 100))
+    assert histogram.percentile(50) == 0
+    for value in (0.5, 5, 5, 50, 500):
+        histogram.observe(value)
+    assert histogram.counts == [1, 2, 1, 1]
+    assert histogram.percentile(50) == 10
+    assert histogram.percentile(80) == 100
+    assert histogram.percentile(99) == 500
+    assert histogram.snapshot() == {
+        'count': 5, 'sum': 560.5, 'max': 500, 'buckets': [1, 2, 1, 1]}
+
+
+def test_report_covers_the_interval():
+    stats = ClientStats()
+    stats.points_sent = 10
+    stats.batch_points.observe(10)
+    first = dict(stats.report('client', retries=1))
+    assert first['client.points_sent'] == 10
+    assert first['client.retries'] == 1
+    assert first['client.batch_points.count'] == 1
+    assert first['client.batch_points.p99'] == 10
+    assert first['client.encode_time.count'] == 0
+    assert 'client.encode_time.mean' not in first
+    stats.points_sent = 15
+    stats.batch_points.observe(5)
+    second = dict(stats.report('client', retries=1))
+    assert second['client.points_sent'] == 5
+    assert second['client.retries'] == 0
+    assert second['client.batch_points.count'] == 1
+    assert second['client.batch_points.mean'] == 5
+
+
+@pytest.mark.asyncio
+async def test_stats_count_what_is_sent():
+    transport = MemoryTransport()
+    async with AIOGraphite('127.0.0.1', transport=transport) as client:
+        await client.send('metric', 1, 1471640923)
+        await client.send_multiple([('a', 1), ('b', 2)], 1471640923)
+        await client.metric('handle').send(3, 1471640923)
+    stats = client.stats()
+    assert stats['messages_sent'] == 3
+    assert stats['points_sent'] == 4
+    assert stats['bytes_sent'] == len(transport.data)
+    assert stats['send_errors'] == 0
+    assert stats['encode_time']['count'] == 3
+    assert stats['send_time']['count'] == 3
+    assert stats['batch_points']['buckets'][:2] == [2, 1]
+    assert len(stats['batch_points']['buckets']) == len(SIZE_BUCKETS) + 1
+
+
+@pytest.mark.asyncio
+async def test_stats_count_errors(unused_tcp_port):
+    client = AIOGraphite('127.0.0.1', unused_tcp_port)
+    with pytest.raises(AioGraphiteSendException):
+        await client.send('metric', 1)
+    stats = client.stats()
+    assert stats['send_errors'] == 1
+    assert stats['messages_sent'] == 0
+
+
+@pytest.mark.asyncio
+async def test_stats_count_reconnects(graphite_server):
+    port, _ = graphite_server
+    transport = TCPTransport('127.0.0.1', port)
+    async with AIOGraphite('127.0.0.1', transport=transport) as client:
+        await client.send('metric', 1)
+        assert client.stats()['reconnects'] == 0
+        await transport.close()
+        await client.send('metric', 2)
+        assert client.stats()['reconnects'] == 1
+        assert client.stats()['retries'] == 0
+
+
+@pytest.mark.asyncio
+async def test_stats_are_sent_under_prefix():
+    transport = MemoryTransport()
+    async with AIOGraphite('127.0.0.1', PlaintextProtocol(),
+                           transport=transport, stats_prefix='self',
+                           stats_interval=0.01) as client:
+        await client.send('metric', 1, 1471640923)
+        await asyncio.sleep(0.05)
+    lines = bytes(transport.data).decode().splitlines()
+    assert lines[0] == 'metric 1 1471640923'
+    names = {line.split()[0] for line in lines[1:]}
+    assert 'self.points_sent' in names
+    assert 'self.send_time.p99' in names
@@ -0,0 +1,123 @@
+import pytest
+import socket
+import threading
+from aiographite.aiographite import AioGraphiteSendException
+from aiographite.protocol import PlaintextProtocol, PickleProtocol
+from aiographite.sync import GraphiteClient, connect_sync
+
+
+class ThreadedServer:
+
+    def __init__(self):
+        self.connections = []
+        self._socket = socket.socket()
+        self._socket.bind(('127.0.0.1', 0))
+        self._socket.listen()
+        self.port = self._socket.getsockname()[1]
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def _serve(self):
+        while True:
+            try:
+                conn, _ = self._socket.accept()
+            except OSError:
+                return
+            received = bytearray()
+            self.connections.append(received)
+            with conn:
+                while True:
+                    data = conn.recv(65536)
+                    if not data:
+                        break
+                    received += data
+
+    @property
+    def received(self):
+        return b''.join(self.connections)
+
+    def close(self):
+        # shutdown interrupts the pending accept
+        self._socket.shutdown(socket.SHUT_RDWR)
+        self._socket.close()
+        self._thread.join(1)
+
+
+@pytest.fixture
+def server():
+    server = ThreadedServer()
+    yield server
+    server.close()
+
+
+def wait_for(server, size):
+    for _ in range(100):
+        if len(server.received) >= size:
+            return
+        threading.Event().wait(0.01)
+
+
+def test_sync_client_send(server):
+    with GraphiteClient('127.0.0.1', server.port) as client:
+        client.send('metric1', 1, 1471640923)
+        client.send_multiple([('metric2', 2), ('metric3', 3, 1471640924)],
+                             timestamp=1471640923)
+        client.send_columns(['metric4'], [4], 1471640923)
+        client.send_stream((('metric5', 5),), timestamp=1471640923)
+    expected = (
+        b'metric1 1 1471640923\nmetric2 2 1471640923\n'
+        b'metric3 3 1471640924\nmetric4 4 1471640923\n'
+        b'metric5 5 1471640923\n')
+    wait_for(server, len(expected))
+    assert server.received == expected
+    assert len(server.connections) == 1
+
+
+@pytest.mark.parametrize("protocol", [
+    PlaintextProtocol(),
+    PickleProtocol(max_frame_points=3),
+    PickleProtocol(memo=False, max_frame_points=3),
+])
+def test_sync_client_buffered(server, protocol):
+    dataset = [('metric%d' % i, i, 1471640923) for i in range(10)]
+    client = connect_sync('127.0.0.1', server.port, protocol,
+                          max_batch_points=4)
+    client.send_multiple(dataset)
+    assert len(client._buffer) == 2
+    client.close()
+    expected = b''.join([
+        protocol.generate_message(dataset[0:4]),
+        protocol.generate_message(dataset[4:8]),
+        protocol.generate_message(dataset[8:]),
+    ])
+    wait_for(server, len(expected))
+    assert server.received == expected
+
+
+def test_sync_client_reconnects(server):
+    client = connect_sync('127.0.0.1', server.port)
+    client._socket.close()
+    client.send('metric1', 1, 1471640923)
+    client.close()
+    wait_for(server, 1)
+    assert server.received == b'metric1 1 1471640923\n'
+
+
+def test_sync_client_raises_when_unreachable():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    client = GraphiteClient('127.0.0.1', port)
+    with pytest.raises(AioGraphiteSendException):
+        client.send('metric1', 1)
+    with pytest.raises(AioGraphiteSendException):
+        GraphiteClient('127.0.0.1', port, protocol='plaintext')
+
+
+@pytest.mark.parametrize("max_batch_points", [None, 100])
+def test_sync_send_columns_length_mismatch(max_batch_points):
+    client = GraphiteClient('127.0.0.1', 1,
+                            max_batch_points=max_batch_points)
+    with pytest.raises(ValueError):
+        client.send_columns(['metric1', 'metric2', 'metric3'], [1], 100)
@@ -0,0 +1,89 @@
+import asyncio
+import pytest
+from aiographite import AIOGraphite
+from aiographite.protocol import PlaintextProtocol, PickleProtocol
+from aiographite.testing import FakeCarbon
+
+
+DATASET = [('metric%d' % i, i, 1471640923 + i) for i in range(10)]
+
+
+@pytest.mark.parametrize("protocol", [PlaintextProtocol(), PickleProtocol()])
+@pytest.mark.asyncio
+async def test_decodes_points(protocol):
+    async with FakeCarbon(protocol=protocol) as carbon:
+        async with AIOGraphite('127.0.0.1', carbon.port,
+                               protocol) as client:
+            await client.send_multiple(DATASET[:5])
+            await client.send_multiple(DATASET[5:])
+            await carbon.wait_for_points(10, timeout=1)
+    assert carbon.points == DATASET
+    assert carbon.points_received == 10
+    assert carbon.connections == 1
+    assert carbon.malformed == 0
+    assert carbon.points_per_second() > 0
+
+
+@pytest.mark.parametrize("protocol", [PlaintextProtocol(), PickleProtocol()])
+@pytest.mark.asyncio
+async def test_only_counts_points(protocol):
+    async with FakeCarbon(protocol=protocol, keep_points=False,
+                          read_size=7) as carbon:
+        async with AIOGraphite('127.0.0.1', carbon.port,
+                               protocol) as client:
+            await client.send_multiple(DATASET)
+            await carbon.wait_for_points(10, timeout=1)
+    assert carbon.points_received == 10
+    assert carbon.points == []
+
+
+@pytest.mark.asyncio
+async def test_plaintext_lines_split_across_reads():
+    async with FakeCarbon(read_size=7) as carbon:
+        async with AIOGraphite('127.0.0.1', carbon.port) as client:
+            await client.send_multiple(DATASET)
+            await carbon.wait_for_points(10, timeout=1)
+    assert carbon.points == DATASET
+
+
+@pytest.mark.asyncio
+async def test_counts_malformed_lines():
+    async with FakeCarbon() as carbon:
+        _, writer = await asyncio.open_connection('127.0.0.1', carbon.port)
+        writer.write(b'garbage\nmetric 1 1471640923\n')
+        await carbon.wait_for_points(1, timeout=1)
+        writer.close()
+    assert carbon.malformed == 1
+    assert carbon.points == [('metric', 1, 1471640923)]
+
+
+@pytest.mark.asyncio
+async def test_reset_after_makes_client_reconnect():
+    async with FakeCarbon(reset_after=5) as carbon:
+        async with AIOGraphite('127.0.0.1', carbon.port) as client:
+            await client.send_multiple(DATASET[:5])
+            await carbon.wait_for_points(5, timeout=1)
+            await asyncio.sleep(0.05)
+            await client.send_multiple(DATASET[5:])
+            await carbon.wait_for_points(10, timeout=1)
+    assert carbon.resets == 2
+    assert carbon.connections == 2
+
+
+@pytest.mark.asyncio
+async def test_pause_applies_backpressure():
+    async with FakeCarbon(keep_points=False) as carbon:
+        client = AIOGraphite('127.0.0.1', carbon.port, timeout=0.1)
+        await client._connect()
+        carbon.pause()
+        dataset = [('metric%d' % i, i) for i in range(100000)]
+        # socket buffers fill up until drain times out, and the client
+        # retries on a new connection
+        for _ in range(50):
+            await client.send_multiple(dataset)
+            if client.stats()['retries']:
+                break
+        assert client.stats()['retries'] >= 1
+        assert carbon.connections >= 2
+        carbon.resume()
+        await client.close()
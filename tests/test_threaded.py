@@ -0,0 +1,84 @@
+import asyncio
+import pytest
+import threading
+from aiographite import ThreadedAIOGraphite
+from aiographite.aiographite import AioGraphiteSendException
+from aiographite.protocol import PickleProtocol
+from aiographite.transport import MemoryTransport
+
+
+class ThreadRecordingTransport(MemoryTransport):
+
+    def __init__(self, host=None, port=None):
+        super().__init__(host, port)
+        self.threads = set()
+        self.failing = False
+
+    async def send(self, message):
+        self.threads.add(threading.get_ident())
+        if self.failing:
+            raise AioGraphiteSendException("unreachable")
+        await super().send(message)
+
+
+def test_threaded_send_nowait():
+    transport = ThreadRecordingTransport()
+    with ThreadedAIOGraphite('unused', transport=transport) as graphite:
+        graphite.send_nowait('metric1', 1, 1471640923)
+        graphite.send_multiple_nowait([('metric2', 2), ('metric3', 3)],
+                                      timestamp=1471640924)
+        graphite.send_nowait('', 4)
+    assert bytes(transport.data) == (
+        b'metric1 1 1471640923\n'
+        b'metric2 2 1471640924\nmetric3 3 1471640924\n')
+    assert transport.threads and \
+        threading.get_ident() not in transport.threads
+    with pytest.raises(AioGraphiteSendException):
+        graphite.send_nowait('metric4', 4)
+
+
+def test_threaded_send_from_many_threads():
+    transport = MemoryTransport()
+    protocol = PickleProtocol()
+    with ThreadedAIOGraphite('unused', protocol=protocol,
+                             transport=transport) as graphite:
+        def work(i):
+            for j in range(100):
+                graphite.send_nowait('metric%d' % i, j, 1471640923)
+
+        threads = [threading.Thread(target=work, args=(i,))
+                   for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    assert transport.data.count(b'metric') == 400
+
+
+def test_threaded_max_pending():
+    transport = MemoryTransport()
+    graphite = ThreadedAIOGraphite('unused', transport=transport,
+                                   max_pending=0)
+    graphite.start()
+    graphite.send_nowait('metric1', 1, 1471640923)
+    graphite.stop()
+    assert graphite.dropped_batches == 1
+    assert transport.data == b''
+
+
+@pytest.mark.asyncio
+async def test_threaded_async_api():
+    transport = ThreadRecordingTransport()
+    async with ThreadedAIOGraphite('unused',
+                                   transport=transport) as graphite:
+        await graphite.send('metric1', 1, 1471640923)
+        assert bytes(transport.data) == b'metric1 1 1471640923\n'
+        await graphite.send_multiple([('metric2', 2)], 1471640923)
+        assert transport.messages_sent == 2
+        transport.failing = True
+        with pytest.raises(AioGraphiteSendException):
+            await graphite.send('metric3', 3, 1471640923)
+        transport.failing = False
+        await graphite.flush()
+    assert threading.get_ident() not in transport.threads
+    await asyncio.sleep(0)
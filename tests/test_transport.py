@@ -0,0 +1,186 @@
+import asyncio
+import pytest
+import socket
+from aiographite import AIOGraphite
+from aiographite.exceptions import AioGraphiteSendException
+from aiographite.protocol import PlaintextProtocol, PickleProtocol
+from aiographite.transport import (
+    TCPTransport, UDPTransport, UnixTransport, MemoryTransport
+)
+
+
+class DatagramCollector(asyncio.DatagramProtocol):
+
+    def __init__(self):
+        self.datagrams = []
+
+    def datagram_received(self, data, addr):
+        self.datagrams.append(data)
+
+
+@pytest.mark.parametrize("message, expected_datagrams", [
+    (b'', []),
+    (b'a 1 1\n', [b'a 1 1\n']),
+    (b'a 1 1\nb 2 2\nc 3 3\n', [b'a 1 1\nb 2 2\n', b'c 3 3\n']),
+    (b'a 1 1\nlong.metric 2 2\nc 3 3\n',
+     [b'a 1 1\n', b'long.metric 2 2\n', b'c 3 3\n']),
+])
+def test_udp_datagrams_split_on_lines(message, expected_datagrams):
+    transport = UDPTransport('127.0.0.1', 2003, max_datagram_size=12)
+    datagrams = [bytes(d) for d in transport._datagrams(message)]
+    assert datagrams == expected_datagrams
+
+
+def test_udp_transport_requires_plaintext():
+    with pytest.raises(AioGraphiteSendException):
+        AIOGraphite('127.0.0.1', 2003, PickleProtocol(),
+                    transport=UDPTransport)
+
+
+@pytest.mark.asyncio
+async def test_udp_transport_send():
+    loop = asyncio.get_running_loop()
+    endpoint, collector = await loop.create_datagram_endpoint(
+        DatagramCollector, local_addr=('127.0.0.1', 0))
+    port = endpoint.get_extra_info('sockname')[1]
+    async with AIOGraphite(
+            '127.0.0.1', port, PlaintextProtocol(),
+            transport=UDPTransport('127.0.0.1', port,
+                                   max_datagram_size=48)) as aiographite:
+        await aiographite.send_multiple(
+            [('metric%d' % i, i) for i in range(4)], timestamp=1471640923)
+        await asyncio.sleep(0.05)
+    endpoint.close()
+    assert collector.datagrams == [
+        b'metric0 0 1471640923\nmetric1 1 1471640923\n',
+        b'metric2 2 1471640923\nmetric3 3 1471640923\n',
+    ]
+
+
+@pytest.mark.asyncio
+async def test_unix_transport_send(tmp_path):
+    received = []
+
+    async def handler(reader, writer):
+        received.append(await reader.read())
+        writer.close()
+
+    path = str(tmp_path / 'carbon.sock')
+    server = await asyncio.start_unix_server(handler, path)
+    async with AIOGraphite(path, protocol=PlaintextProtocol(),
+                           transport=UnixTransport) as aiographite:
+        assert aiographite.transport.is_connected
+        await aiographite.send('metric1', 1, 1471640923)
+    await asyncio.sleep(0.05)
+    server.close()
+    assert received == [b'metric1 1 1471640923\n']
+
+
+@pytest.mark.asyncio
+async def test_unix_transport_connect_raise_exception(tmp_path):
+    aiographite = AIOGraphite(str(tmp_path / 'missing.sock'),
+                              transport=UnixTransport)
+    with pytest.raises(AioGraphiteSendException):
+        await aiographite._connect()
+
+
+@pytest.mark.parametrize("keep_data", [True, False])
+@pytest.mark.asyncio
+async def test_memory_transport(keep_data):
+    transport = MemoryTransport(keep_data=keep_data)
+    protocol = PickleProtocol(max_frame_points=1)
+    dataset = [('metric1', 1, 1471640923), ('metric2', 2, 1471640923)]
+    async with AIOGraphite('unused', protocol=protocol,
+                           transport=transport) as aiographite:
+        await aiographite.send_multiple(dataset)
+    message = protocol.generate_message(dataset)
+    assert transport.messages_sent == 1
+    assert transport.bytes_sent == len(message)
+    assert transport.data == (message if keep_data else b'')
+
+
+def test_transport_class_gets_timeout(tmp_path):
+    aiographite = AIOGraphite(str(tmp_path / 'carbon.sock'),
+                              protocol=PlaintextProtocol(), timeout=5,
+                              transport=UnixTransport)
+    assert aiographite.transport.timeout == 5
+    with pytest.raises(TypeError):
+        AIOGraphite('127.0.0.1', protocol=PlaintextProtocol(), timeout=5,
+                    transport=UDPTransport)
+
+
+class BlackholeTransport(TCPTransport):
+
+    async def _open_connection(self):
+        await asyncio.sleep(10)
+
+
+@pytest.mark.asyncio
+async def test_connect_timeout():
+    transport = BlackholeTransport('127.0.0.1', 2003, connect_timeout=0.05)
+    start = asyncio.get_running_loop().time()
+    with pytest.raises(AioGraphiteSendException):
+        await transport.connect()
+    assert asyncio.get_running_loop().time() - start < 1
+
+
+@pytest.mark.asyncio
+async def test_tcp_socket_options(graphite_server):
+    port, _ = graphite_server
+    transport = TCPTransport('127.0.0.1', port, keepalive=30)
+    await transport.connect()
+    sock = transport._writer.get_extra_info('socket')
+    assert sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY)
+    assert sock.getsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE)
+    await transport.close()
+
+
+@pytest.mark.asyncio
+async def test_reconnects_when_server_closed_connection():
+    received = []
+
+    async def handler(reader, writer):
+        # close the first connection right away, as a restarting carbon
+        if not received:
+            received.append(b'')
+            writer.close()
+            return
+        received.append(await reader.read())
+        writer.close()
+
+    server = await asyncio.start_server(handler, '127.0.0.1', 0)
+    port = server.sockets[0].getsockname()[1]
+    transport = TCPTransport('127.0.0.1', port)
+    await transport.connect()
+    await asyncio.sleep(0.05)
+    assert not transport.is_alive()
+    await transport.send(b'metric1 1 1471640923\n')
+    await transport.close()
+    await asyncio.sleep(0.05)
+    server.close()
+    assert received == [b'', b'metric1 1 1471640923\n']
+
+
+@pytest.mark.asyncio
+async def test_idle_timeout_reopens_connection():
+    connections = []
+
+    async def handler(reader, writer):
+        connections.append(await reader.read())
+        writer.close()
+
+    server = await asyncio.start_server(handler, '127.0.0.1', 0)
+    port = server.sockets[0].getsockname()[1]
+    async with AIOGraphite('127.0.0.1', port, PlaintextProtocol(),
+                           idle_timeout=0.05) as aiographite:
+        await aiographite.send('metric1', 1, 1471640923)
+        await aiographite.send('metric2', 2, 1471640923)
+        await asyncio.sleep(0.1)
+        assert not aiographite.transport.is_alive()
+        await aiographite.send('metric3', 3, 1471640923)
+    await asyncio.sleep(0.05)
+    server.close()
+    assert connections == [
+        b'metric1 1 1471640923\nmetric2 2 1471640923\n',
+        b'metric3 3 1471640923\n',
+    ]